@@ -0,0 +1,75 @@
+"""Headless JSON prediction API for the six models.
+
+Run alongside the Streamlit app with::
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+Tabular endpoints take a JSON object of features. Image endpoints take a
+multipart upload (field ``file``) or JSON ``{"image": "<base64>"}``.
+"""
+import base64
+import binascii
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+
+from utils.artifacts import ChecksumError
+from utils.metrics import render_prometheus
+from utils.model_registry import registry
+from utils.predictors import predict_image, predict_record, start_warmup
+from utils.worker_pool import PoolBusy, WorkerUnavailable, start_worker_pool
+
+app = FastAPI(title="AI Health Assistant API")
+start_worker_pool()
+start_warmup()
+
+TABULAR_ENDPOINTS = {"malaria": "malaria", "breast": "breast", "tb-symptoms": "tb_symptoms"}
+IMAGE_ENDPOINTS = {"brain": "brain", "lung": "lung", "covid": "covid"}
+
+
+async def _read_image_bytes(request):
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=422, detail="Multipart field 'file' is required")
+        return await upload.read()
+    payload = await request.json()
+    try:
+        return base64.b64decode(payload["image"], validate=True)
+    except (KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=422, detail="JSON field 'image' must be base64-encoded image data")
+
+
+@app.get("/health")
+def health():
+    pool = start_worker_pool()
+    return {"status": "ok", "models": registry.stats(), "workers": pool.stats() if pool else []}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return render_prometheus()
+
+
+@app.post("/predict/{endpoint}")
+async def predict(endpoint: str, request: Request):
+    try:
+        if endpoint in TABULAR_ENDPOINTS:
+            record = await request.json()
+            if not isinstance(record, dict):
+                raise HTTPException(status_code=422, detail="Expected a JSON object of features")
+            return await run_in_threadpool(predict_record, TABULAR_ENDPOINTS[endpoint], record)
+        if endpoint in IMAGE_ENDPOINTS:
+            data = await _read_image_bytes(request)
+            return await run_in_threadpool(predict_image, IMAGE_ENDPOINTS[endpoint], data)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=f"Model file not found: {e.filename}")
+    except ChecksumError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (PoolBusy, WorkerUnavailable, TimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except (ValueError, KeyError, OSError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    raise HTTPException(status_code=404, detail=f"Unknown model: {endpoint}")
@@ -0,0 +1,77 @@
+"""Measure the cold-start cost of every Streamlit page.
+
+Each page is measured in a fresh interpreter. The page's own top-level
+imports are timed first, then the page runs once through Streamlit's app
+testing harness. For each we report the import time, the first script run
+(which no longer includes those imports), whether TensorFlow ended up
+imported, and peak RSS::
+
+    python benchmarks/cold_start.py [--json cold_start.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = [
+    "app.py",
+    "pages/1_Malaria.py",
+    "pages/2_Brain.py",
+    "pages/3_BreastCancer.py",
+    "pages/4_TB.py",
+    "pages/5_TBSymptoms.py",
+    "pages/6_Covid.py",
+]
+
+# Runs inside the fresh interpreter; prints one JSON line.
+_PROBE = """
+import ast, json, resource, sys, time
+with open(sys.argv[1]) as f:
+    tree = ast.parse(f.read())
+imports = ast.Module([n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))], type_ignores=[])
+start = time.perf_counter()
+exec(compile(imports, sys.argv[1], "exec"), {})
+import_seconds = time.perf_counter() - start
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness_seconds = time.perf_counter() - start
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+run_seconds = time.perf_counter() - start
+print(json.dumps({
+    "page": sys.argv[1],
+    "page_import_seconds": round(import_seconds, 3),
+    "harness_import_seconds": round(harness_seconds, 3),
+    "first_run_seconds": round(run_seconds, 3),
+    "tensorflow_imported": "tensorflow" in sys.modules,
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "exception": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def measure(page):
+    output = subprocess.run([sys.executable, "-c", _PROBE, page], cwd=ROOT_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = [measure(page) for page in PAGES]
+    print(f"{'page':<26}{'imports (s)':>12}{'first run (s)':>14}{'TF loaded':>11}{'peak RSS (MB)':>15}")
+    for r in results:
+        print(f"{r['page']:<26}{r['page_import_seconds']:>12.2f}{r['first_run_seconds']:>14.2f}"
+              f"{str(r['tensorflow_imported']):>11}{r['peak_rss_mb']:>15.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""Load-test the prediction paths with many simulated concurrent clinicians.
+
+Two targets:
+
+* ``apptest`` (default) drives the pages through Streamlit's app testing
+  harness: each session runs the page's real script, fills in the form and
+  presses Predict (or uploads a scan and presses Analyze), then checks for
+  a result. The harness keeps its mock Runtime in a per-process singleton,
+  so every simulated user (open-loop: every in-flight slot) is its own
+  process running one session at a time.
+* ``http`` posts to a prediction API (``api.py`` or anything with the same
+  routes: ``POST {url}/predict/<model>`` with a JSON record, or
+  ``{"image": <base64>}`` for image models).
+
+Load is either closed-loop (``--users 1,2,4,8``: each user sends a request,
+waits for it, thinks for ``--think-time`` seconds, repeats) or open-loop
+(``--rates 1,5,10``: Poisson arrivals at that many requests per second,
+latency counted from the scheduled arrival). Each level runs for
+``--duration`` seconds and reports throughput, tail latency and error rate,
+giving a saturation curve per model::
+
+    python benchmarks/load_test.py breast malaria --users 1,2,4,8,16
+    python benchmarks/load_test.py covid --target http --url http://localhost:8000 --rates 2,5,10,20
+"""
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.models import RESULTS_DIR, SEED, encoded_images, environment, tabular_records  # noqa: E402
+
+_MAIN = sys.modules["__main__"]
+
+PAGES = {
+    "malaria": "pages/1_Malaria.py",
+    "brain": "pages/2_Brain.py",
+    "breast": "pages/3_BreastCancer.py",
+    "lung": "pages/4_TB.py",
+    "tb_symptoms": "pages/5_TBSymptoms.py",
+    "covid": "pages/6_Covid.py",
+}
+IMAGE_MODELS = ("brain", "lung", "covid")
+HTTP_ENDPOINTS = {"tb_symptoms": "tb-symptoms"}
+# Bounds of the breast cancer form's number inputs
+BREAST_INPUT_RANGE = (0.0, 1000.0)
+
+
+class RequestFailed(Exception):
+    """A simulated request completed without a prediction."""
+
+
+# ----------------------------
+# Inputs
+# ----------------------------
+def make_inputs(model, count, rng):
+    if model in IMAGE_MODELS:
+        return encoded_images(count, rng)
+    records = tabular_records(model, count, rng)
+    if model == "breast":
+        records = [{k: float(np.clip(v, *BREAST_INPUT_RANGE)) for k, v in r.items()} for r in records]
+    return records
+
+
+# ----------------------------
+# Targets
+# ----------------------------
+def _check_page(at):
+    if at.exception:
+        raise RequestFailed(at.exception[0].value)
+    if at.error:
+        raise RequestFailed(at.error[0].value)
+
+
+def apptest_request(model):
+    """Return a callable that runs one page session for ``model``.
+
+    Sessions must not run concurrently within one process (see the module
+    docstring).
+    """
+    from streamlit.testing.v1 import AppTest
+    from streamlit.testing.v1.element_tree import FileUploader
+
+    page = os.path.join(ROOT_DIR, PAGES[model])
+
+    if model in IMAGE_MODELS and not hasattr(FileUploader, "upload"):
+        # Older Streamlit cannot upload files in tests: run the page's own
+        # predict path (decode in the preprocessing pool, then classify)
+        from utils.imaging import preprocess_async
+        from utils.predictors import IMAGE_MODELS as SPECS
+        from utils.predictors import classify_image_array
+
+        size = SPECS[model]["size"]
+
+        def run(data):
+            return classify_image_array(model, preprocess_async(data, size, model).result())
+        return run
+
+    def run(payload):
+        at = AppTest.from_file(page, default_timeout=120).run()
+        _check_page(at)
+        if model in IMAGE_MODELS:
+            at.file_uploader[0].upload("scan.jpg", payload, "image/jpeg").run()
+            button = "Analyze Image"
+        else:
+            for name, value in payload.items():
+                if model == "malaria" or isinstance(value, str):
+                    next(w for w in at.selectbox if w.label == name or w.key == name).set_value(value)
+                else:
+                    at.number_input(key=name).set_value(value)
+            button = "Predict"
+        next(b for b in at.button if button in b.label).click().run()
+        _check_page(at)
+        if not any('class="result-box' in m.value for m in at.markdown):
+            raise RequestFailed("no prediction rendered")
+    return run
+
+
+def http_request(model, url, timeout):
+    endpoint = f"{url.rstrip('/')}/predict/{HTTP_ENDPOINTS.get(model, model)}"
+
+    def run(payload):
+        if model in IMAGE_MODELS:
+            payload = {"image": base64.b64encode(payload).decode()}
+        request = urllib.request.Request(endpoint, data=json.dumps(payload).encode(),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            raise RequestFailed(f"HTTP {e.code}") from None
+    return run
+
+
+# ----------------------------
+# Load generation
+# ----------------------------
+def _error_kind(exc):
+    return str(exc) if isinstance(exc, RequestFailed) else type(exc).__name__
+
+
+def _call(run, payload, started, latencies, errors, lock):
+    try:
+        run(payload)
+        with lock:
+            latencies.append(time.perf_counter() - started)
+    except Exception as e:
+        with lock:
+            errors[_error_kind(e)] += 1
+
+
+def closed_loop(run, inputs, users, duration, think_time):
+    latencies, errors, lock = [], Counter(), threading.Lock()
+    deadline = time.perf_counter() + duration
+    counter = iter(range(sys.maxsize))
+
+    def user():
+        while time.perf_counter() < deadline:
+            with lock:
+                i = next(counter)
+            _call(run, inputs[i % len(inputs)], time.perf_counter(), latencies, errors, lock)
+            if think_time:
+                time.sleep(think_time)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def open_loop(run, inputs, rate, duration, max_in_flight, rng):
+    latencies, errors, lock = [], Counter(), threading.Lock()
+    start = time.perf_counter()
+    arrival = start
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        i = 0
+        while True:
+            arrival += rng.exponential(1.0 / rate)
+            if arrival - start > duration:
+                break
+            time.sleep(max(0.0, arrival - time.perf_counter()))
+            # Latency is measured from the scheduled arrival, so queueing counts
+            pool.submit(_call, run, inputs[i % len(inputs)], arrival, latencies, errors, lock)
+            i += 1
+    return latencies, errors, time.perf_counter() - start
+
+
+def _session_process(model, inputs, offset, duration, think_time, jobs, results, barrier):
+    # One simulated user: warm up, wait for the others, then either loop
+    # (closed-loop, jobs is None) or serve scheduled arrivals from ``jobs``.
+    # Times are time.monotonic(), which is shared by every process.
+    run = apptest_request(model)
+    try:
+        run(inputs[offset % len(inputs)])
+    except Exception:
+        pass  # reported by the measured requests
+    latencies, errors = [], Counter()
+
+    def call(i, started):
+        try:
+            run(inputs[i % len(inputs)])
+            latencies.append(time.monotonic() - started)
+        except Exception as e:
+            errors[_error_kind(e)] += 1
+
+    barrier.wait()
+    if jobs is None:
+        deadline = time.monotonic() + duration
+        i = offset
+        while time.monotonic() < deadline:
+            call(i, time.monotonic())
+            i += 1
+            if think_time:
+                time.sleep(think_time)
+    else:
+        for i, arrival in iter(jobs.get, None):
+            call(i, arrival)
+    results.put((latencies, dict(errors)))
+
+
+def process_load(model, inputs, processes, duration, think_time=0.0, rate=None, rng=None):
+    """Run ``processes`` page sessions in parallel processes and measure them.
+
+    Without ``rate`` each process is a closed-loop user; with it, arrivals
+    are Poisson at ``rate`` per second and go to whichever process is free.
+    """
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(processes + 1)
+    results = context.Queue()
+    jobs = context.Queue() if rate else None
+    workers = [context.Process(target=_session_process, daemon=True,
+                               args=(model, inputs, offset, duration, think_time, jobs, results, barrier))
+               for offset in range(processes)]
+    # AppTest leaves the last page it ran installed as __main__, which spawn
+    # would re-run in every child; start them from this script instead
+    page_main, sys.modules["__main__"] = sys.modules["__main__"], _MAIN
+    try:
+        for worker in workers:
+            worker.start()
+    finally:
+        sys.modules["__main__"] = page_main
+    barrier.wait(timeout=600)  # every process has imported the page and loaded its model
+    start = time.monotonic()
+    if rate:
+        arrival, i = start, 0
+        while True:
+            arrival += rng.exponential(1.0 / rate)
+            if arrival - start > duration:
+                break
+            time.sleep(max(0.0, arrival - time.monotonic()))
+            jobs.put((i, arrival))
+            i += 1
+        for _ in workers:
+            jobs.put(None)
+    latencies, errors = [], Counter()
+    for _ in workers:
+        done, failed = results.get()
+        latencies.extend(done)
+        errors.update(failed)
+    elapsed = time.monotonic() - start
+    for worker in workers:
+        worker.join()
+    return latencies, errors, elapsed
+
+
+def summarize(level, latencies, errors, elapsed):
+    total = len(latencies) + sum(errors.values())
+    ms = np.asarray(latencies) * 1e3
+    percentile = (lambda q: round(float(np.percentile(ms, q)), 2)) if len(ms) else (lambda q: None)
+    return {
+        **level,
+        "requests": total,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+        "errors": dict(errors.most_common(5)),
+    }
+
+
+def _levels(text):
+    return [float(x) for x in text.split(",")] if text else []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("models", nargs="*", help=f"models to load (default: all of {', '.join(PAGES)})")
+    parser.add_argument("--target", choices=["apptest", "http"], default="apptest")
+    parser.add_argument("--url", default="http://localhost:8000", help="prediction API base URL (http target)")
+    parser.add_argument("--users", default="1,2,4,8", help="closed-loop concurrency levels")
+    parser.add_argument("--rates", help="open-loop arrival rates in requests/s (replaces --users)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--think-time", type=float, default=0.0, help="closed-loop pause between requests")
+    parser.add_argument("--max-in-flight", type=int,
+                        help="open-loop client concurrency cap (default: 256 for http, "
+                             "one process per CPU for apptest)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="HTTP request timeout")
+    parser.add_argument("--inputs", type=int, default=64, help="distinct synthetic inputs per model")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/load-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    models = args.models or list(PAGES)
+    unknown = sorted(set(models) - set(PAGES))
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+
+    rng = np.random.default_rng(SEED)
+    results = []
+    print(f"{'model':<12}{'level':>10}{'req/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'errors':>9}")
+    for model in models:
+        inputs = make_inputs(model, args.inputs, rng)
+        run = apptest_request(model) if args.target == "apptest" else http_request(model, args.url, args.timeout)
+        try:
+            run(inputs[0])  # warm-up: model load, first page run
+        except Exception as e:
+            print(f"{model:<12}  skipped: {_error_kind(e)}")
+            results.append({"model": model, "skipped": _error_kind(e)})
+            continue
+
+        curve = []
+        if args.rates:
+            for rate in _levels(args.rates):
+                if args.target == "apptest":
+                    slots = args.max_in_flight or os.cpu_count() or 1
+                    measured = process_load(model, inputs, slots, args.duration, rate=rate, rng=rng)
+                else:
+                    measured = open_loop(run, inputs, rate, args.duration, args.max_in_flight or 256, rng)
+                curve.append(summarize({"arrival_rate": rate}, *measured))
+        else:
+            for users in _levels(args.users):
+                if args.target == "apptest":
+                    measured = process_load(model, inputs, int(users), args.duration, args.think_time)
+                else:
+                    measured = closed_loop(run, inputs, int(users), args.duration, args.think_time)
+                curve.append(summarize({"users": int(users)}, *measured))
+        for point in curve:
+            level = f"{point['arrival_rate']}/s" if "arrival_rate" in point else f"{point['users']} users"
+            print(f"{model:<12}{level:>10}{point['throughput_rps']:>10.1f}{point['p50_ms'] or 0:>10.1f}"
+                  f"{point['p95_ms'] or 0:>10.1f}{point['p99_ms'] or 0:>10.1f}{point['error_rate']:>9.1%}")
+        results.append({"model": model, "curve": curve})
+
+    report = {
+        "environment": environment(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("models", "output")},
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{report['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Benchmark every predictor on synthetic inputs and write the results as JSON.
+
+Each model runs in a fresh interpreter so its cold load and peak RSS are
+measured in isolation. For each we report:
+
+* cold load time of the model and the artifacts it depends on,
+* warm single-request latency (p50/p95/p99) per stage and end to end,
+* throughput at several batch sizes,
+* peak RSS of the process.
+
+Inputs are synthetic but follow each model's schema (8 Yes/No symptoms,
+10 breast metrics, 13 TB fields, 224x224 or 180x180 RGB images) and are
+drawn from a fixed seed, so runs are comparable across releases::
+
+    python benchmarks/models.py                        # all models
+    python benchmarks/models.py breast covid --requests 500
+    python benchmarks/models.py --compare benchmarks/results/previous.json
+
+Without ``--output`` results go to ``benchmarks/results/models-<commit>.json``.
+``--compare`` prints the change against an earlier file and exits non-zero
+when a warm p50 or a throughput regresses by more than ``--tolerance``.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+MODELS = ["malaria", "breast", "tb_symptoms", "brain", "lung", "covid"]
+TABULAR_BATCH_SIZES = [1, 100, 1_000, 10_000]
+IMAGE_BATCH_SIZES = [1, 8, 32]
+SEED = 0
+
+
+# ----------------------------
+# Synthetic inputs
+# ----------------------------
+def tabular_records(model_key, count, rng):
+    import numpy as np
+
+    from utils.model_registry import get_model
+    from utils.tabular import (BREAST_FEATURES, MALARIA_SYMPTOMS, TB_CATEGORICAL, TB_FEATURES,
+                               TB_NUMERIC)
+
+    if model_key == "malaria":
+        return [dict(zip(MALARIA_SYMPTOMS, rng.choice(["Yes", "No"], len(MALARIA_SYMPTOMS))))
+                for _ in range(count)]
+    if model_key == "breast":
+        features, numeric, categorical = BREAST_FEATURES, BREAST_FEATURES, []
+        scaler = get_model("breast_scaler")
+    else:
+        features, numeric, categorical = TB_FEATURES, TB_NUMERIC, TB_CATEGORICAL
+        scaler = get_model("tb_scaler")
+    # Numeric fields around the fitted distribution, clipped at zero like the forms
+    values = np.maximum(rng.normal(scaler.mean_, scaler.scale_, (count, len(numeric))), 0.0)
+    records = [dict(zip(numeric, map(float, row))) for row in values]
+    if categorical:
+        encoders = get_model("tb_encoders")
+        for record in records:
+            record.update({f: str(rng.choice(encoders[f].classes_)) for f in categorical})
+    return [{f: record[f] for f in features} for record in records]
+
+
+def encoded_images(count, rng, size=(512, 512)):
+    import numpy as np
+    from PIL import Image
+
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (*size, 3), dtype=np.uint8)).save(buffer, "JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+# ----------------------------
+# Measurements (run inside the child process)
+# ----------------------------
+def _percentiles(samples):
+    import numpy as np
+
+    ms = np.asarray(samples) * 1e3
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 4),
+            "p95_ms": round(float(np.percentile(ms, 95)), 4),
+            "p99_ms": round(float(np.percentile(ms, 99)), 4)}
+
+
+def _timed_stages(stages, count):
+    """Run ``stages`` (name -> callable(i, previous)) ``count`` times and time each one."""
+    timings = {name: [] for name in stages}
+    timings["total"] = []
+    for i in range(count):
+        value = None
+        start = time.perf_counter()
+        for name, stage in stages.items():
+            stage_start = time.perf_counter()
+            value = stage(i, value)
+            timings[name].append(time.perf_counter() - stage_start)
+        timings["total"].append(time.perf_counter() - start)
+    return {name: _percentiles(samples) for name, samples in timings.items()}
+
+
+def _throughput(run_batch, batch_sizes, min_seconds):
+    results = []
+    for batch_size in batch_sizes:
+        run_batch(batch_size)  # warm up this batch shape
+        done, start = 0, time.perf_counter()
+        while time.perf_counter() - start < min_seconds:
+            run_batch(batch_size)
+            done += batch_size
+        elapsed = time.perf_counter() - start
+        results.append({"batch_size": batch_size, "items_per_second": round(done / elapsed, 2)})
+    return results
+
+
+def bench_tabular(model_key, requests, min_seconds, rng):
+    import pandas as pd
+
+    from utils.model_registry import get_model
+    from utils.predictors import _ARTIFACTS
+    from utils.tabular import classify, featurize_record, score_chunk
+
+    start = time.perf_counter()
+    for name in _ARTIFACTS.get(model_key, [model_key]):
+        get_model(name)
+    cold_load = time.perf_counter() - start
+
+    records = tabular_records(model_key, requests, rng)
+    classify(model_key, featurize_record(model_key, records[0]))  # first-call warm-up
+    latency = _timed_stages({
+        "featurize": lambda i, _: featurize_record(model_key, records[i]),
+        "inference": lambda i, features: classify(model_key, features),
+    }, requests)
+
+    frame = pd.DataFrame(tabular_records(model_key, max(TABULAR_BATCH_SIZES), rng))
+    throughput = _throughput(lambda n: score_chunk(model_key, frame.iloc[:n]), TABULAR_BATCH_SIZES, min_seconds)
+    return cold_load, latency, throughput
+
+
+def bench_image(model_name, requests, min_seconds, rng):
+    import numpy as np
+
+    from utils.imaging import decode_and_preprocess
+    from utils.model_registry import get_model
+    from utils.predictors import IMAGE_MODELS, classify_image_batch
+
+    start = time.perf_counter()
+    get_model(model_name)
+    cold_load = time.perf_counter() - start
+
+    size = IMAGE_MODELS[model_name]["size"]
+    images = encoded_images(min(requests, 64), rng)
+    latency = _timed_stages({
+        "preprocess": lambda i, _: decode_and_preprocess(images[i % len(images)], size, model_name),
+        "inference": lambda i, array: classify_image_batch(model_name, array[np.newaxis]),
+    }, requests)
+
+    arrays = np.stack([decode_and_preprocess(data, size, model_name) for data in images[:max(IMAGE_BATCH_SIZES)]])
+    arrays = np.concatenate([arrays] * (max(IMAGE_BATCH_SIZES) // len(arrays) + 1))
+    throughput = _throughput(lambda n: classify_image_batch(model_name, arrays[:n]), IMAGE_BATCH_SIZES, min_seconds)
+    return cold_load, latency, throughput
+
+
+def _peak_rss_mb():
+    # VmHWM starts over at exec; ru_maxrss would include the parent's peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_child(model, requests, min_seconds):
+    import warnings
+
+    import numpy as np
+
+    from utils.predictors import IMAGE_MODELS
+
+    warnings.filterwarnings("ignore")
+    rng = np.random.default_rng(SEED)
+    result = {"model": model}
+    try:
+        bench = bench_image if model in IMAGE_MODELS else bench_tabular
+        cold_load, latency, throughput = bench(model, requests, min_seconds, rng)
+        result.update({
+            "cold_load_seconds": round(cold_load, 4),
+            "latency": latency,
+            "throughput": throughput,
+        })
+    except FileNotFoundError as e:
+        result["skipped"] = f"model file not found: {e.filename}"
+    result["peak_rss_mb"] = _peak_rss_mb()
+    print(json.dumps(result))
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+def measure(model, requests, min_seconds):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", model,
+         "--requests", str(requests), "--min-seconds", str(min_seconds)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": ROOT_DIR, "TF_CPP_MIN_LOG_LEVEL": "2"},
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def environment():
+    from importlib.metadata import PackageNotFoundError, version as installed
+
+    def version(*distributions):
+        for distribution in distributions:
+            try:
+                return installed(distribution)
+            except PackageNotFoundError:
+                pass
+        return None
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": version("numpy"),
+        "scikit-learn": version("scikit-learn"),
+        "tensorflow": version("tensorflow", "tensorflow-cpu"),
+        "env": {k: v for k, v in os.environ.items()
+                if k in ("IMAGE_BACKEND", "FOREST_BACKEND", "MODEL_MMAP", "INFERENCE_WORKERS")},
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Print the change against ``baseline`` and return the regressions."""
+    previous = {r["model"]: r for r in baseline["results"] if "latency" in r}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result["model"])
+        if before is None or "latency" not in result:
+            continue
+        p50, old_p50 = result["latency"]["total"]["p50_ms"], before["latency"]["total"]["p50_ms"]
+        change = p50 / old_p50 - 1 if old_p50 else 0.0
+        print(f"{result['model']:<12} warm p50 {old_p50:.3f} -> {p50:.3f} ms ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(f"{result['model']} warm p50 {change:+.1%}")
+        old_throughput = {t["batch_size"]: t["items_per_second"] for t in before["throughput"]}
+        for t in result["throughput"]:
+            old = old_throughput.get(t["batch_size"])
+            if old and t["items_per_second"] / old - 1 < -tolerance:
+                regressions.append(f"{result['model']} throughput@{t['batch_size']} "
+                                   f"{t['items_per_second'] / old - 1:+.1%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("models", nargs="*", help=f"models to benchmark (default: all of {', '.join(MODELS)})")
+    parser.add_argument("--requests", type=int, default=200, help="warm single requests per model")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="minimum time per throughput point")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/models-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed regression (fraction)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child, args.requests, args.min_seconds)
+        return
+    unknown = sorted(set(args.models) - set(MODELS))
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+
+    report = {
+        "environment": environment(),
+        "config": {"requests": args.requests, "min_seconds": args.min_seconds, "seed": SEED,
+                   "tabular_batch_sizes": TABULAR_BATCH_SIZES, "image_batch_sizes": IMAGE_BATCH_SIZES},
+        "results": [measure(model, args.requests, args.min_seconds) for model in args.models or MODELS],
+    }
+
+    print(f"{'model':<12}{'cold load (s)':>14}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}"
+          f"{'best items/s':>14}{'peak RSS (MB)':>15}")
+    for r in report["results"]:
+        if "skipped" in r:
+            print(f"{r['model']:<12}  skipped: {r['skipped']}")
+            continue
+        total = r["latency"]["total"]
+        best = max(t["items_per_second"] for t in r["throughput"])
+        print(f"{r['model']:<12}{r['cold_load_seconds']:>14.3f}{total['p50_ms']:>10.3f}{total['p95_ms']:>10.3f}"
+              f"{total['p99_ms']:>10.3f}{best:>14,.0f}{r['peak_rss_mb']:>15.1f}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"models-{report['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            raise SystemExit("Regressions: " + "; ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,30 @@
 import streamlit as st
-import joblib
-from fpdf import FPDF
-import base64
-import os
 
-# ----------------------------
-# Load your model
-# ----------------------------
-model_path = os.path.join("models", "Malpred.joblib")
-model = joblib.load(model_path)
+from utils.metrics import start_metrics_server
+from utils.predictors import predict_record
+from utils.reports import generate_report
+from utils.tabular import MALARIA_SYMPTOMS
+from utils.ui import MODEL_ERRORS, model_error_message, render_bulk_scoring
+from utils.worker_pool import start_worker_pool
 
-# Label mapping
-label_mapping = {1: "High Possibility of Malaria", 0: "Low Possibility of Malaria"}
+start_metrics_server()
+start_worker_pool()
 
-# Prediction function
-def predict_malaria(input_data):
-    prediction = model.predict([input_data])[0]  # Predict the class (0 or 1)
-    return label_mapping[prediction]
+# Prediction function (repeated symptom sets are answered from the prediction cache)
+def predict_malaria(symptoms):
+    return predict_record("malaria", symptoms)["prediction"]
 
-# PDF generation function
+# PDF generation function (rendered in memory, safe under concurrent sessions)
 def generate_pdf(result, symptoms, bp, temperature):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="Medical Report", ln=True, align='C')
-    pdf.ln(10)
-    
-    # Prediction result
-    pdf.set_font("Arial", style='B', size=12)
-    pdf.cell(200, 10, txt="Prediction Result:", ln=True)
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Likelihood of Illness: {result}", ln=True)
-    pdf.ln(10)
-    
-    # Symptoms
-    pdf.set_font("Arial", style='B', size=12)
-    pdf.cell(200, 10, txt="Symptoms:", ln=True)
-    pdf.set_font("Arial", size=12)
-    for symptom_name, presence in symptoms.items():
-        pdf.cell(200, 10, txt=f"{symptom_name}: {presence}", ln=True)
-    pdf.ln(10)
-    
-    # Additional info
-    pdf.set_font("Arial", style='B', size=12)
-    pdf.cell(200, 10, txt="Additional Medical Information:", ln=True)
-    pdf.set_font("Arial", size=12)
-    if bp:
-        pdf.cell(200, 10, txt=f"Blood Pressure: {bp}", ln=True)
-    else:
-        pdf.cell(200, 10, txt="Blood Pressure: Invalid or not provided.", ln=True)
-    pdf.cell(200, 10, txt=f"Temperature: {temperature:.1f}°C", ln=True)
-    
-    pdf_file = "medical_report.pdf"
-    pdf.output(pdf_file)
-    return pdf_file
+    sections = [
+        ("Prediction Result:", [f"Likelihood of Illness: {result}"]),
+        ("Symptoms:", [f"{symptom_name}: {presence}" for symptom_name, presence in symptoms.items()]),
+        ("Additional Medical Information:", [
+            f"Blood Pressure: {bp}" if bp else "Blood Pressure: Invalid or not provided.",
+            f"Temperature: {temperature:.1f}°C",
+        ]),
+    ]
+    return generate_report(sections, model="malaria")
 
 # ----------------------------
 # Streamlit App UI/UX Styling
@@ -166,9 +137,6 @@ with col2:
 
 st.markdown('</div>', unsafe_allow_html=True)
 
-# Map "Yes"/"No" to 1/0
-input_data = [1 if value == "Yes" else 0 for value in symptoms.values()]
-
 # ----------------------------
 # Additional Medical Inputs
 # ----------------------------
@@ -188,7 +156,11 @@ if st.button("Predict"):
     except ValueError:
         bp_valid = None
 
-    result = predict_malaria(input_data)
+    try:
+        result = predict_malaria(symptoms)
+    except MODEL_ERRORS as e:
+        st.error(model_error_message(e))
+        st.stop()
 
     # ----------------------------
     # Display Prediction
@@ -215,8 +187,14 @@ if st.button("Predict"):
     # ----------------------------
     # Generate PDF
     # ----------------------------
-    pdf_file = generate_pdf(result, symptoms, bp_valid, temperature)
-    with open(pdf_file, "rb") as pdf:
-        b64_pdf = base64.b64encode(pdf.read()).decode('utf-8')
-        href = f'<a href="data:application/octet-stream;base64,{b64_pdf}" download="{pdf_file}">📥 Download Medical Report (PDF)</a>'
-        st.markdown(href, unsafe_allow_html=True)
+    st.download_button(
+        "📥 Download Medical Report (PDF)",
+        data=generate_pdf(result, symptoms, bp_valid, temperature),
+        file_name="medical_report.pdf",
+        mime="application/pdf",
+    )
+
+# ----------------------------
+# Bulk Scoring
+# ----------------------------
+render_bulk_scoring("malaria", MALARIA_SYMPTOMS, "malaria")
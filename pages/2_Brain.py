@@ -1,11 +1,14 @@
 import streamlit as st
-import tensorflow as tf
-from tensorflow.keras import layers
-from PIL import Image
-import numpy as np
-import os
-import time
-import random
+
+from utils.metrics import start_metrics_server
+from utils.predictors import IMAGE_MODELS, predict_image, prefetch_model
+from utils.reports import generate_report, prediction_sections
+from utils.timing import StageTimer
+from utils.ui import MODEL_ERRORS, model_error_message, render_bulk_image_screening, start_image_preprocessing
+from utils.worker_pool import start_worker_pool
+
+start_metrics_server()
+start_worker_pool()
 
 # -------------------------------
 # Page title
@@ -97,28 +100,9 @@ st.markdown("""
 st.markdown('<div class="main-title">🧠 Brain Tumor MRI Classifier</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-title">Upload an MRI brain scan image, and analyze it to predict the tumor type or if it is normal.</div>', unsafe_allow_html=True)
 
-# -------------------------------
-# Load the trained model
-# -------------------------------
-@st.cache_resource
-def load_model():
-    MODEL_PATH = os.path.join(os.path.dirname(__file__), "../models/Brain_model.keras")
-    
-    if not os.path.exists(MODEL_PATH):
-        st.error(f"Model file not found at {MODEL_PATH}")
-        return None
-
-    model = tf.keras.models.load_model(MODEL_PATH)
-    return model
-
-model = load_model()
-if model is None:
-    st.stop()
-
 # -------------------------------
 # Class names and clinical tooltips
 # -------------------------------
-class_names = ['glioma', 'meningioma', 'notumor', 'pituitary']
 class_tooltips = {
     'glioma': "Malignant tumor originating from glial cells in the brain.",
     'meningioma': "Usually benign tumor arising from the meninges, the brain's protective membranes.",
@@ -137,8 +121,11 @@ col1, col2 = st.columns([2,1])
 
 with col1:
     if uploaded_file:
-        image = Image.open(uploaded_file).convert("RGB")
-        st.image(image, caption="Uploaded MRI", use_container_width=True)
+        # Load the model (and TensorFlow) in the background and decode and
+        # resize the image in the worker pool while the user reviews it
+        prefetch_model("brain")
+        preprocessing = start_image_preprocessing("brain", uploaded_file, IMAGE_MODELS["brain"]["size"])
+        st.image(uploaded_file, caption="Uploaded MRI", use_container_width=True)
 
 # -------------------------------
 # Analyze Image Button
@@ -146,34 +133,50 @@ with col1:
 with col2:
     if st.button("🩺 Analyze Image", disabled=analyze_disabled):
         # -------------------------------
-        # Spinner / analyzing
+        # Progress driven by the real preprocessing and inference stages
         # -------------------------------
-        analyze_time = random.randint(7, 12)
-        with st.spinner(f"Analyzing MRI scan... (approximately {analyze_time} seconds)"):
-            time.sleep(analyze_time)
-
-        # -------------------------------
-        # Preprocess image
-        # -------------------------------
-        IMG_SIZE = (224, 224)
-        img = image.resize(IMG_SIZE)
-        img_array = np.array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-
-        # Make prediction
-        predictions = model.predict(img_array)
-        predicted_index = np.argmax(predictions[0])
-        predicted_class = class_names[predicted_index]
-        confidence = predictions[0][predicted_index]
+        progress = st.progress(0.0, text="Analyzing MRI scan...")
+        timer = StageTimer(["Model loading", "Preprocessing", "Inference"],
+                           on_progress=lambda fraction, label: progress.progress(fraction, text=label))
+
+        # Resubmitted images are answered from the prediction cache
+        try:
+            result = predict_image("brain", uploaded_file.getvalue(), preprocessing=preprocessing, timer=timer)
+        except MODEL_ERRORS as e:
+            progress.empty()
+            st.error(model_error_message(e))
+            st.stop()
+        progress.empty()
+
+        predicted_class = result["prediction"]
+        confidence = result["confidence"]
 
         # -------------------------------
         # Display results
         # -------------------------------
         st.markdown(f'<div class="result-box {predicted_class}">Prediction: {predicted_class}</div>', unsafe_allow_html=True)
         st.markdown(f"Confidence: **{confidence*100:.2f}%**")
+        st.caption(f"⏱️ {timer.summary()}" if timer.durations else "⚡ Served from cache")
 
         # Clinical explanation / tooltip
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("Clinical Interpretation")
         st.write(f"{class_tooltips[predicted_class]}")
         st.markdown('</div>', unsafe_allow_html=True)
+
+        report = generate_report(
+            prediction_sections(result, inputs={"Image": uploaded_file.name},
+                                interpretation=class_tooltips[predicted_class]),
+            model="brain",
+        )
+        st.download_button(
+            "📥 Download Medical Report (PDF)",
+            data=report,
+            file_name="brain_mri_report.pdf",
+            mime="application/pdf",
+        )
+
+# -------------------------------
+# Bulk Screening
+# -------------------------------
+render_bulk_image_screening("brain", "brain_mri")
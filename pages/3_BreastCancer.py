@@ -1,7 +1,15 @@
 import streamlit as st
-import joblib
-import pandas as pd
-import os
+
+from utils.metrics import start_metrics_server
+from utils.model_registry import get_model
+from utils.predictors import ensure_model, predict_record
+from utils.reports import generate_report, prediction_sections
+from utils.tabular import BREAST_FEATURES
+from utils.ui import MODEL_ERRORS, model_error_message, render_bulk_scoring, render_class_distribution
+from utils.worker_pool import start_worker_pool
+
+start_metrics_server()
+start_worker_pool()
 
 # ----------------------------
 # Page Config
@@ -80,7 +88,7 @@ st.markdown("""
     }
 
     /* Button styling */
-    .stButton button {
+    .stButton button, .stFormSubmitButton button {
         background-color: #0a3d62;
         color: white;
         font-weight: bold;
@@ -89,7 +97,7 @@ st.markdown("""
         border: none;
     }
 
-    .stButton button:hover {
+    .stButton button:hover, .stFormSubmitButton button:hover {
         background-color: #3c6382;
         color: white;
     }
@@ -106,15 +114,15 @@ st.markdown('<div class="sub-title">Enter patient metrics to predict whether the
 # ----------------------------
 # Load Model and Scaler
 # ----------------------------
-model_path = os.path.join("models", "rf_breast_top10 (1).joblib")
-scaler_path = os.path.join("models", "scaler_top10.joblib")
-
-if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+try:
+    ensure_model("breast")
+    get_model("breast_scaler")  # features are scaled in this process
+except FileNotFoundError:
     st.error("Model or scaler files not found in the models folder!")
     st.stop()
-
-model = joblib.load(model_path)
-scaler = joblib.load(scaler_path)
+except MODEL_ERRORS as e:
+    st.error(model_error_message(e))
+    st.stop()
 
 # ----------------------------
 # Patient Metrics Input (Main Page)
@@ -122,40 +130,50 @@ scaler = joblib.load(scaler_path)
 st.markdown('<div class="card">', unsafe_allow_html=True)
 st.subheader("Patient Metrics Input")
 
-feature_names = [
-    'radius_mean', 'perimeter_mean', 'area_mean',
-    'concavity_mean', 'concave points_mean',
-    'radius_worst', 'perimeter_worst', 'area_worst',
-    'concavity_worst', 'concave points_worst'
-]
-
 # Optional: simple icons for features (you can replace with emojis or font-awesome)
 feature_icons = ['📏', '📐', '📊', '🔺', '⚫', '📏', '📐', '📊', '🔺', '⚫']
 
-col1, col2 = st.columns(2)
-input_data = {}
+# Inputs are only read when the form is submitted, not on every widget change
+with st.form("breast_form"):
+    col1, col2 = st.columns(2)
+    input_data = {}
 
-for i, feature in enumerate(feature_names):
-    target_col = col1 if i % 2 == 0 else col2
-    with target_col:
-        st.markdown(f'<div class="input-icon"><span>{feature_icons[i]}</span> {feature}</div>', unsafe_allow_html=True)
-        input_data[feature] = st.number_input(feature, min_value=0.0, max_value=1000.0, step=0.01, key=feature)
+    for i, feature in enumerate(BREAST_FEATURES):
+        target_col = col1 if i % 2 == 0 else col2
+        with target_col:
+            st.markdown(f'<div class="input-icon"><span>{feature_icons[i]}</span> {feature}</div>', unsafe_allow_html=True)
+            input_data[feature] = st.number_input(feature, min_value=0.0, max_value=1000.0, step=0.01, key=feature)
 
-st.markdown('</div>', unsafe_allow_html=True)
+    submitted = st.form_submit_button("Predict")
 
-# Convert to DataFrame and scale
-input_df = pd.DataFrame([input_data])
-input_scaled = scaler.transform(input_df)
+st.markdown('</div>', unsafe_allow_html=True)
 
 # ----------------------------
 # Prediction Button
 # ----------------------------
-if st.button("Predict"):
-    pred = model.predict(input_scaled)[0]
-    pred_proba = model.predict_proba(input_scaled)[0][pred]
-    label = "Malignant" if pred == 1 else "Benign"
+if submitted:
+    try:
+        result = predict_record("breast", input_data)
+    except MODEL_ERRORS as e:
+        st.error(model_error_message(e))
+        st.stop()
+    label = result["prediction"]
+    pred_proba = result["confidence"]
 
     # Display result with color box
     risk_class = "malignant" if label == "Malignant" else "benign"
     st.markdown(f'<div class="result-box {risk_class}">🧾 Prediction: {label}</div>', unsafe_allow_html=True)
     st.markdown(f"Confidence: **{pred_proba*100:.2f}%**")
+    render_class_distribution(result)
+
+    st.download_button(
+        "📥 Download Medical Report (PDF)",
+        data=generate_report(prediction_sections(result, inputs=input_data), model="breast"),
+        file_name="breast_cancer_report.pdf",
+        mime="application/pdf",
+    )
+
+# ----------------------------
+# Bulk Scoring
+# ----------------------------
+render_bulk_scoring("breast", BREAST_FEATURES, "breast_cancer")
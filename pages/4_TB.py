@@ -1,11 +1,14 @@
 import streamlit as st
-import tensorflow as tf
-from tensorflow.keras import layers
-from PIL import Image
-import numpy as np
-import os
-import time
-import random
+
+from utils.metrics import start_metrics_server
+from utils.predictors import IMAGE_MODELS, predict_image, prefetch_model
+from utils.reports import generate_report, prediction_sections
+from utils.timing import StageTimer
+from utils.ui import MODEL_ERRORS, model_error_message, render_bulk_image_screening, start_image_preprocessing
+from utils.worker_pool import start_worker_pool
+
+start_metrics_server()
+start_worker_pool()
 
 # -------------------------------
 # Page title
@@ -41,25 +44,9 @@ st.markdown("""
 st.markdown('<div class="main-title">🫁 Lung X-ray Disease Classifier</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-title">Upload a chest X-ray image to analyze and predict the lung condition.</div>', unsafe_allow_html=True)
 
-# -------------------------------
-# Load model
-# -------------------------------
-@st.cache_resource
-def load_model():
-    MODEL_PATH = os.path.join(os.path.dirname(__file__), "../models/NPT lungs_model.keras")
-    if not os.path.exists(MODEL_PATH):
-        st.error(f"Model file not found at {MODEL_PATH}")
-        return None
-    return tf.keras.models.load_model(MODEL_PATH)
-
-model = load_model()
-if model is None:
-    st.stop()
-
 # -------------------------------
 # Classes and descriptions
 # -------------------------------
-class_names = ['NORMAL', 'PNEUMONIA', 'TUBERCULOSIS']
 class_descriptions = {
     "NORMAL": "No apparent lung disease detected; X-ray appears within normal limits.",
     "PNEUMONIA": "Lung infection causing inflammation; characterized by opacities on X-ray.",
@@ -80,30 +67,33 @@ col1, col2 = st.columns([2,1])
 
 with col1:
     if uploaded_file:
-        image = Image.open(uploaded_file).convert("RGB")
-        st.image(image, caption="Uploaded X-ray", use_container_width=True)
+        # Load the model (and TensorFlow) in the background and decode and
+        # resize the image in the worker pool while the user reviews it
+        prefetch_model("lung")
+        preprocessing = start_image_preprocessing("lung", uploaded_file, IMAGE_MODELS["lung"]["size"])
+        st.image(uploaded_file, caption="Uploaded X-ray", use_container_width=True)
 
 # -------------------------------
 # Analyze button
 # -------------------------------
 with col2:
     if st.button("🩺 Analyze Image", disabled=analyze_disabled):
-        # Spinner with random delay
-        analyze_time = random.randint(7, 12)
-        with st.spinner(f"Analyzing X-ray image... (approx {analyze_time} seconds)"):
-            time.sleep(analyze_time)
-
-        # Preprocess
-        IMG_SIZE = (224, 224)
-        img = image.resize(IMG_SIZE)
-        img_array = np.array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-
-        # Predict
-        predictions = model.predict(img_array)
-        predicted_index = np.argmax(predictions[0])
-        predicted_class = class_names[predicted_index]
-        confidence = predictions[0][predicted_index]
+        # Progress driven by the real preprocessing and inference stages
+        progress = st.progress(0.0, text="Analyzing X-ray image...")
+        timer = StageTimer(["Model loading", "Preprocessing", "Inference"],
+                           on_progress=lambda fraction, label: progress.progress(fraction, text=label))
+
+        # Resubmitted images are answered from the prediction cache
+        try:
+            result = predict_image("lung", uploaded_file.getvalue(), preprocessing=preprocessing, timer=timer)
+        except MODEL_ERRORS as e:
+            progress.empty()
+            st.error(model_error_message(e))
+            st.stop()
+        progress.empty()
+
+        predicted_class = result["prediction"]
+        confidence = result["confidence"]
 
         # Display predicted class with tooltip
         st.markdown(
@@ -114,9 +104,27 @@ with col2:
         st.markdown(
             f'<div class="progress-bar" style="width:{confidence*100}%; background-color:{class_colors[predicted_class]}">'
             f'{confidence*100:.2f}%</div>', unsafe_allow_html=True)
+        st.caption(f"⏱️ {timer.summary()}" if timer.durations else "⚡ Served from cache")
 
         # Clinical card
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("Clinical Interpretation")
         st.write(class_descriptions[predicted_class])
         st.markdown('</div>', unsafe_allow_html=True)
+
+        report = generate_report(
+            prediction_sections(result, inputs={"Image": uploaded_file.name},
+                                interpretation=class_descriptions[predicted_class]),
+            model="lung",
+        )
+        st.download_button(
+            "📥 Download Medical Report (PDF)",
+            data=report,
+            file_name="lung_xray_report.pdf",
+            mime="application/pdf",
+        )
+
+# -------------------------------
+# Bulk Screening
+# -------------------------------
+render_bulk_image_screening("lung", "lung_xray")
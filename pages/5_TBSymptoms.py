@@ -1,7 +1,15 @@
 import streamlit as st
-import joblib
-import pandas as pd
-import os
+
+from utils.metrics import start_metrics_server
+from utils.model_registry import get_model
+from utils.predictors import ensure_model, predict_record
+from utils.reports import generate_report, prediction_sections
+from utils.tabular import TB_CATEGORICAL, TB_FEATURES
+from utils.ui import MODEL_ERRORS, model_error_message, render_bulk_scoring, render_class_distribution
+from utils.worker_pool import start_worker_pool
+
+start_metrics_server()
+start_worker_pool()
 
 # ----------------------------
 # Page Config
@@ -73,7 +81,7 @@ st.markdown("""
         background-color: #079992;
     }
 
-    .stButton button {
+    .stButton button, .stFormSubmitButton button {
         background-color: #0a3d62;
         color: white;
         font-weight: bold;
@@ -82,7 +90,7 @@ st.markdown("""
         border: none;
     }
 
-    .stButton button:hover {
+    .stButton button:hover, .stFormSubmitButton button:hover {
         background-color: #3c6382;
         color: white;
     }
@@ -99,17 +107,16 @@ st.markdown('<div class="sub-title">Enter patient details to predict whether the
 # ----------------------------
 # Load model, scaler, encoders
 # ----------------------------
-model_path = os.path.join("models", "rf_tb_top.joblib")
-scaler_path = os.path.join("models", "scaler_tb_top.joblib")
-encoders_path = os.path.join("models", "tb_label_encoders.joblib")
-
-if not all(os.path.exists(p) for p in [model_path, scaler_path, encoders_path]):
+try:
+    ensure_model("tb_symptoms")
+    get_model("tb_scaler")  # features are scaled in this process
+    label_encoders = get_model("tb_encoders")
+except FileNotFoundError:
     st.error("One or more required files (model, scaler, encoders) are missing in the models folder!")
     st.stop()
-
-model = joblib.load(model_path)
-scaler = joblib.load(scaler_path)
-label_encoders = joblib.load(encoders_path)
+except MODEL_ERRORS as e:
+    st.error(model_error_message(e))
+    st.stop()
 
 # ----------------------------
 # Patient Details Input (Main Page)
@@ -117,18 +124,6 @@ label_encoders = joblib.load(encoders_path)
 st.markdown('<div class="card">', unsafe_allow_html=True)
 st.subheader("Patient Details Input")
 
-features = [
-    "Age", "Gender", "Chest_Pain", "Cough_Severity", "Breathlessness",
-    "Fatigue", "Weight_Loss", "Fever", "Night_Sweats", "Sputum_Production",
-    "Blood_in_Sputum", "Smoking_History", "Previous_TB_History"
-]
-
-categorical_features = [
-    "Gender", "Chest_Pain", "Fever", "Night_Sweats", 
-    "Sputum_Production", "Blood_in_Sputum", 
-    "Smoking_History", "Previous_TB_History"
-]
-
 # Optional icons for features
 feature_icons = {
     "Age":"🎂", "Gender":"🚻", "Chest_Pain":"❤️", "Cough_Severity":"🤧", 
@@ -137,48 +132,53 @@ feature_icons = {
     "Smoking_History":"🚬", "Previous_TB_History":"🏥"
 }
 
-# Organize inputs in two columns
-col1, col2 = st.columns(2)
-input_data = {}
-
-for i, feature in enumerate(features):
-    target_col = col1 if i % 2 == 0 else col2
-    with target_col:
-        icon = feature_icons.get(feature, "🩺")
-        st.markdown(f'<div class="input-icon"><span>{icon}</span> {feature}</div>', unsafe_allow_html=True)
-        if feature in categorical_features:
-            input_data[feature] = st.selectbox(
-                feature, options=list(label_encoders[feature].classes_), key=feature
-            )
-        else:
-            input_data[feature] = st.number_input(feature, min_value=0.0, step=0.01, key=feature)
+# Organize inputs in two columns; they are only read when the form is submitted
+with st.form("tb_symptoms_form"):
+    col1, col2 = st.columns(2)
+    input_data = {}
+
+    for i, feature in enumerate(TB_FEATURES):
+        target_col = col1 if i % 2 == 0 else col2
+        with target_col:
+            icon = feature_icons.get(feature, "🩺")
+            st.markdown(f'<div class="input-icon"><span>{icon}</span> {feature}</div>', unsafe_allow_html=True)
+            if feature in TB_CATEGORICAL:
+                input_data[feature] = st.selectbox(
+                    feature, options=list(label_encoders[feature].classes_), key=feature
+                )
+            else:
+                input_data[feature] = st.number_input(feature, min_value=0.0, step=0.01, key=feature)
+
+    submitted = st.form_submit_button("Predict")
 
 st.markdown('</div>', unsafe_allow_html=True)
 
-# Convert to DataFrame
-input_df = pd.DataFrame([input_data])
-
-# Encode categorical features
-for feature in categorical_features:
-    le = label_encoders[feature]
-    input_df[feature] = le.transform(input_df[feature])
-
-# Scale numeric features
-numeric_cols = ["Age", "Cough_Severity", "Breathlessness", "Fatigue", "Weight_Loss"]
-input_df[numeric_cols] = scaler.transform(input_df[numeric_cols])
-
 # ----------------------------
 # Prediction
 # ----------------------------
-if st.button("Predict"):
-    pred = model.predict(input_df)[0]
-    pred_proba = model.predict_proba(input_df)[0][pred]
-    
-    # Decode target label
-    class_le = label_encoders["Class"]
-    label = class_le.inverse_transform([pred])[0]
+if submitted:
+    try:
+        result = predict_record("tb_symptoms", input_data)
+    except MODEL_ERRORS as e:
+        st.error(model_error_message(e))
+        st.stop()
+    label = result["prediction"]
+    pred_proba = result["confidence"]
 
     # Display result with color box
     risk_class = "tb-positive" if label.lower() == "tb" else "tb-negative"
     st.markdown(f'<div class="result-box {risk_class}">🧾 Prediction: {label}</div>', unsafe_allow_html=True)
     st.markdown(f"Confidence: **{pred_proba*100:.2f}%**")
+    render_class_distribution(result)
+
+    st.download_button(
+        "📥 Download Medical Report (PDF)",
+        data=generate_report(prediction_sections(result, inputs=input_data), model="tb_symptoms"),
+        file_name="tb_symptoms_report.pdf",
+        mime="application/pdf",
+    )
+
+# ----------------------------
+# Bulk Scoring
+# ----------------------------
+render_bulk_scoring("tb_symptoms", TB_FEATURES, "tb_symptoms")
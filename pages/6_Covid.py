@@ -1,28 +1,18 @@
 import streamlit as st
-import numpy as np
-from PIL import Image
-from tensorflow.keras.models import load_model
-import tensorflow as tf
-import os
-import gdown
-import time
-import random
 
-# -------------------------------
-# Download and load model
-# -------------------------------
-FILE_ID = "1eLk7CUpfx5ZnTcoiV6w-ecuI4JfzKXIS"
-MODEL_PATH = "my1_cnn_lung_model.h5"
+from utils.metrics import start_metrics_server
+from utils.predictors import IMAGE_MODELS, predict_image, prefetch_model
+from utils.reports import generate_report, prediction_sections
+from utils.timing import StageTimer
+from utils.ui import MODEL_ERRORS, model_error_message, render_bulk_image_screening, start_image_preprocessing
+from utils.worker_pool import start_worker_pool
 
-if not os.path.exists(MODEL_PATH):
-    gdown.download(f"https://drive.google.com/uc?id={FILE_ID}", MODEL_PATH, quiet=False)
-
-model = load_model(MODEL_PATH)
+start_metrics_server()
+start_worker_pool()
 
 # -------------------------------
 # Classes and clinical info
 # -------------------------------
-class_names = ['COVID', 'NORMAL']
 class_descriptions = {
     'COVID': "Chest X-ray shows signs consistent with COVID-19 infection, including lung opacities and inflammation.",
     'NORMAL': "No signs of infection detected; lungs appear healthy and normal on X-ray."
@@ -65,28 +55,33 @@ col1, col2 = st.columns([2,1])
 
 with col1:
     if uploaded_file:
-        image = Image.open(uploaded_file).convert("RGB")
-        st.image(image, caption="Uploaded Image", use_container_width=True)
+        # Load the model (and TensorFlow) in the background and decode and
+        # resize the image in the worker pool while the user reviews it
+        prefetch_model("covid")
+        preprocessing = start_image_preprocessing("covid", uploaded_file, IMAGE_MODELS["covid"]["size"])
+        st.image(uploaded_file, caption="Uploaded Image", use_container_width=True)
 
 # -------------------------------
 # Analyze Image button
 # -------------------------------
 with col2:
     if st.button("🩺 Analyze Image", disabled=analyze_disabled):
-        # Spinner with random delay
-        analyze_time = random.randint(7, 12)
-        with st.spinner(f"Analyzing X-ray image... (approx {analyze_time} seconds)"):
-            time.sleep(analyze_time)
+        # Progress driven by the real preprocessing and inference stages
+        progress = st.progress(0.0, text="Analyzing X-ray image...")
+        timer = StageTimer(["Model loading", "Preprocessing", "Inference"],
+                           on_progress=lambda fraction, label: progress.progress(fraction, text=label))
 
-        # Preprocess
-        image_resized = image.resize((180, 180))
-        image_array = np.array(image_resized) / 255.0
-        image_array = np.expand_dims(image_array, axis=0)
+        # Resubmitted images are answered from the prediction cache
+        try:
+            result = predict_image("covid", uploaded_file.getvalue(), preprocessing=preprocessing, timer=timer)
+        except MODEL_ERRORS as e:
+            progress.empty()
+            st.error(model_error_message(e))
+            st.stop()
+        progress.empty()
 
-        # Predict
-        prediction = model.predict(image_array)[0]
-        predicted_class = class_names[np.argmax(prediction)]
-        confidence = float(np.max(prediction))
+        predicted_class = result["prediction"]
+        confidence = result["confidence"]
 
         # Result box with tooltip
         st.markdown(
@@ -97,9 +92,27 @@ with col2:
         st.markdown(
             f'<div class="progress-bar" style="width:{confidence*100}%; background-color:{class_colors[predicted_class]}">'
             f'{confidence*100:.2f}%</div>', unsafe_allow_html=True)
+        st.caption(f"⏱️ {timer.summary()}" if timer.durations else "⚡ Served from cache")
 
         # Clinical explanation card
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("Clinical Interpretation")
         st.write(class_descriptions[predicted_class])
         st.markdown('</div>', unsafe_allow_html=True)
+
+        report = generate_report(
+            prediction_sections(result, inputs={"Image": uploaded_file.name},
+                                interpretation=class_descriptions[predicted_class]),
+            model="covid",
+        )
+        st.download_button(
+            "📥 Download Medical Report (PDF)",
+            data=report,
+            file_name="covid_xray_report.pdf",
+            mime="application/pdf",
+        )
+
+# -------------------------------
+# Bulk Screening
+# -------------------------------
+render_bulk_image_screening("covid", "covid_xray")
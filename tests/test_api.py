@@ -0,0 +1,58 @@
+import os
+
+# Don't load every model in the background while the tests run
+os.environ.setdefault("WARMUP_MODELS", "")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api import app  # noqa: E402
+from utils.tabular import BREAST_FEATURES, MALARIA_SYMPTOMS  # noqa: E402
+
+client = TestClient(app)
+
+
+def test_breast_null_feature_is_rejected():
+    record = {feature: 10.0 for feature in BREAST_FEATURES}
+    record["radius_mean"] = None
+    response = client.post("/predict/breast", json=record)
+    assert response.status_code == 422
+    assert "radius_mean must be a number" in response.json()["detail"]
+
+
+def test_breast_list_feature_is_rejected():
+    record = {feature: 10.0 for feature in BREAST_FEATURES}
+    record["area_worst"] = [1, 2]
+    response = client.post("/predict/breast", json=record)
+    assert response.status_code == 422
+
+
+def test_breast_valid_record():
+    record = {feature: 10.0 for feature in BREAST_FEATURES}
+    response = client.post("/predict/breast", json=record)
+    assert response.status_code == 200
+    assert response.json()["prediction"] in ("Benign", "Malignant")
+
+
+def test_breast_non_finite_feature_is_rejected():
+    for value in ("NaN", "inf", "-Infinity"):
+        record = {feature: 10.0 for feature in BREAST_FEATURES}
+        record["radius_mean"] = value
+        response = client.post("/predict/breast", json=record)
+        assert response.status_code == 422, value
+        assert "radius_mean must be a number" in response.json()["detail"]
+
+
+def test_malaria_invalid_symptom_is_rejected():
+    for value in (None, "banana", 2, [1]):
+        record = {symptom: "No" for symptom in MALARIA_SYMPTOMS}
+        record["Fever"] = value
+        response = client.post("/predict/malaria", json=record)
+        assert response.status_code == 422, value
+        assert "Fever must be Yes or No" in response.json()["detail"]
+
+
+def test_malaria_accepts_yes_no_true_false_1_0():
+    values = ["Yes", "no", "TRUE", "false", 1, 0, True, "1"]
+    record = dict(zip(MALARIA_SYMPTOMS, values))
+    response = client.post("/predict/malaria", json=record)
+    assert response.status_code == 200
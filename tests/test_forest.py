@@ -0,0 +1,40 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from utils.forest import CompiledForest, _samples, parity_check
+from utils.model_registry import get_model
+
+
+@pytest.fixture(scope="module")
+def breast_model():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return get_model("breast")
+
+
+def _check(model, X):
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        report = parity_check(model, X)
+    assert report["top1_agreement"] == 1.0
+    assert report["max_abs_diff"] < 1e-9
+
+
+def test_compiled_forest_matches_sklearn(breast_model):
+    _check(breast_model, _samples(breast_model, 2000))
+
+
+def test_compiled_forest_routes_missing_values_like_sklearn(breast_model):
+    X = _samples(breast_model, 2000, seed=1)
+    X[np.random.default_rng(1).random(X.shape) < 0.2] = np.nan
+    X[0] = np.nan
+    _check(breast_model, X)
+
+
+def test_compiled_forest_rejects_infinity(breast_model):
+    X = _samples(breast_model, 4)
+    X[1, 3] = np.inf
+    with pytest.raises(ValueError):
+        CompiledForest(breast_model).predict_proba(X)
@@ -0,0 +1,335 @@
+"""Local model artifact store described by ``models/manifest.json``.
+
+Each manifest entry records an artifact's file, version, framework, size,
+SHA-256 and (optionally) a download source. Artifacts are fetched ahead of
+time, at deploy, so serving never touches the network::
+
+    python -m utils.artifacts prefetch   # download missing artifacts, verify all
+    python -m utils.artifacts verify     # verify what is on disk
+    python -m utils.artifacts record     # pin sha256/size of files on disk
+    python -m utils.artifacts mmap       # write memory-mappable sklearn exports
+
+TFLite exports of the image models (``python -m utils.tflite_backend``) are
+recorded in ``models/tflite.json`` with their own SHA-256 and that of the
+Keras file they were converted from, and are only served while both match.
+
+Checksums are verified once per file: the result is remembered in
+``models/.verified.json`` together with the file's size and mtime, and the
+file is only hashed again when either changes.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(ROOT_DIR, "models")
+MANIFEST_PATH = os.path.join(MODELS_DIR, "manifest.json")
+VERIFIED_PATH = os.path.join(MODELS_DIR, ".verified.json")
+MMAP_DIR = os.path.join(MODELS_DIR, "mmap")
+MMAP_INDEX_PATH = os.path.join(MMAP_DIR, "index.json")
+TFLITE_INDEX_PATH = os.path.join(MODELS_DIR, "tflite.json")
+
+_lock = threading.Lock()
+
+
+class ChecksumError(RuntimeError):
+    """An artifact on disk does not match the checksum in the manifest."""
+
+
+def load_manifest():
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)["artifacts"]
+
+
+def save_manifest(artifacts):
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump({"artifacts": artifacts}, f, indent=2)
+        f.write("\n")
+
+
+def artifact_path(entry):
+    return os.path.join(MODELS_DIR, entry["file"])
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json(path, data):
+    """Replace ``path`` atomically so concurrent readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _load_verified():
+    try:
+        with open(VERIFIED_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def sha256(path):
+    """Return the SHA-256 of ``path``, hashing it only if it changed on disk."""
+    stat = os.stat(path)
+    key = os.path.relpath(path, MODELS_DIR)
+    stamp = {"size": stat.st_size, "mtime": stat.st_mtime}
+    with _lock:
+        known = _load_verified().get(key)
+        if known and known["size"] == stamp["size"] and known["mtime"] == stamp["mtime"]:
+            return known["sha256"]
+        stamp["sha256"] = _file_sha256(path)
+        # Re-read just before writing: other worker processes may have
+        # recorded files meanwhile. At worst a lost entry is hashed again.
+        verified = _load_verified()
+        verified[key] = stamp
+        try:
+            _write_json(VERIFIED_PATH, verified)
+        except OSError:
+            logger.warning("Could not record verified checksum in %s", VERIFIED_PATH)
+        return stamp["sha256"]
+
+
+def verify(name, entry):
+    """Check the artifact on disk against its manifest entry."""
+    path = artifact_path(entry)
+    if not os.path.exists(path):
+        raise FileNotFoundError(2, "Model file not found (run `python -m utils.artifacts prefetch`)", path)
+    if entry.get("sha256") is None:
+        logger.warning("Artifact %s has no pinned sha256; run `python -m utils.artifacts record`", name)
+        return path
+    if sha256(path) != entry["sha256"]:
+        raise ChecksumError(f"Checksum mismatch for {name} ({entry['file']})")
+    return path
+
+
+def resolve(name):
+    """Return the verified local path of the artifact ``name``."""
+    return verify(name, load_manifest()[name])
+
+
+# ----------------------------
+# Prefetching
+# ----------------------------
+def _check_download(name, entry, path):
+    if entry.get("size") is not None and os.path.getsize(path) != entry["size"]:
+        raise ChecksumError(f"Size mismatch for downloaded {name} ({entry['file']})")
+    if entry.get("sha256") is not None and _file_sha256(path) != entry["sha256"]:
+        raise ChecksumError(f"Checksum mismatch for downloaded {name} ({entry['file']})")
+
+
+def _download(name, entry, path):
+    """Download ``entry``'s source and move it to ``path`` once it checks out."""
+    source = entry["source"]
+    kind, _, location = source.partition(":")
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    os.close(fd)
+    try:
+        if kind == "gdrive":
+            import gdown
+            gdown.download(f"https://drive.google.com/uc?id={location}", tmp_path, quiet=False)
+        elif kind in ("http", "https"):
+            import urllib.request
+            with urllib.request.urlopen(source) as response, open(tmp_path, "wb") as f:
+                shutil.copyfileobj(response, f)
+        else:
+            raise ValueError(f"Unsupported artifact source: {source}")
+        _check_download(name, entry, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def prefetch(names=None):
+    """Download missing artifacts that have a source and verify every artifact.
+
+    Returns ``{name: status}`` with status ``ok``, ``missing`` or an error.
+    """
+    artifacts = load_manifest()
+    statuses = {}
+    for name in names or artifacts:
+        entry = artifacts[name]
+        path = artifact_path(entry)
+        try:
+            if not os.path.exists(path) and entry.get("source"):
+                logger.info("Downloading %s from %s", name, entry["source"])
+                _download(name, entry, path)
+            verify(name, entry)
+            statuses[name] = "ok"
+        except FileNotFoundError:
+            statuses[name] = "missing"
+        except ChecksumError as e:
+            statuses[name] = str(e)
+    return statuses
+
+
+def record(names=None):
+    """Pin the sha256 and size of the artifacts currently on disk."""
+    artifacts = load_manifest()
+    for name in names or artifacts:
+        path = artifact_path(artifacts[name])
+        if os.path.exists(path):
+            artifacts[name]["sha256"] = _file_sha256(path)
+            artifacts[name]["size"] = os.path.getsize(path)
+    save_manifest(artifacts)
+
+
+# ----------------------------
+# Memory-mappable exports
+# ----------------------------
+# sklearn trees copy their node arrays into private buffers when unpickled,
+# so a forest loaded in N worker processes costs N copies. The exports store
+# forests as ``CompiledForest`` (plain NumPy arrays) and everything else
+# as-is, uncompressed, so ``joblib.load(mmap_mode="r")`` maps the arrays
+# straight from the page cache shared by every process on the host. The
+# malaria model is exported as its lookup table (utils.malaria_table).
+def _source_digest(name, entry):
+    return entry.get("sha256") or sha256(artifact_path(entry))
+
+
+def export_mmap(names=None):
+    """Write memory-mappable exports of the sklearn artifacts present on disk."""
+    import joblib
+
+    from utils.forest import compiled
+
+    artifacts = load_manifest()
+    os.makedirs(MMAP_DIR, exist_ok=True)
+    index = _load_mmap_index()
+    for name in names or artifacts:
+        entry = artifacts[name]
+        if entry["framework"] != "sklearn" or not os.path.exists(artifact_path(entry)):
+            continue
+        if name == "malaria":
+            # Served from its lookup table, which is built and stored here
+            from utils import malaria_table
+            malaria_table.load(verify(name, entry))
+            continue
+        obj = joblib.load(verify(name, entry))
+        if hasattr(obj, "predict_proba"):
+            obj = compiled(obj) or obj
+        # Workers may be mapping the current export: write beside it and swap
+        fd, tmp_path = tempfile.mkstemp(dir=MMAP_DIR, suffix=".part")
+        os.close(fd)
+        try:
+            joblib.dump(obj, tmp_path, compress=0)
+            os.replace(tmp_path, os.path.join(MMAP_DIR, entry["file"]))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        index[name] = _source_digest(name, entry)
+        logger.info("Exported %s as %s", name, type(obj).__name__)
+    _write_json(MMAP_INDEX_PATH, index)
+
+
+def _load_mmap_index():
+    try:
+        with open(MMAP_INDEX_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def mmap_export(name):
+    """Return the path of an up-to-date mmap export of ``name``, or None."""
+    entry = load_manifest()[name]
+    path = os.path.join(MMAP_DIR, entry["file"])
+    if not os.path.exists(path) or _load_mmap_index().get(name) != _source_digest(name, entry):
+        return None
+    return path
+
+
+# ----------------------------
+# TFLite exports
+# ----------------------------
+def _load_tflite_index():
+    try:
+        with open(TFLITE_INDEX_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_tflite(name, path, quantization):
+    """Record the TFLite export of ``name`` at ``path`` and the model it came from."""
+    index = _load_tflite_index()
+    index[name] = {
+        "file": os.path.relpath(path, MODELS_DIR),
+        "quantization": quantization,
+        "sha256": _file_sha256(path),
+        "source_sha256": _source_digest(name, load_manifest()[name]),
+    }
+    _write_json(TFLITE_INDEX_PATH, index)
+
+
+def tflite_export(name):
+    """Return the verified path of an up-to-date TFLite export of ``name``, or None.
+
+    None means there is no recorded export or it was converted from a
+    different model file; an export changed since it was recorded raises
+    ``ChecksumError``.
+    """
+    exported = _load_tflite_index().get(name)
+    if exported is None:
+        return None
+    path = os.path.join(MODELS_DIR, exported["file"])
+    if not os.path.exists(path) or exported["source_sha256"] != _source_digest(name, load_manifest()[name]):
+        return None
+    if sha256(path) != exported["sha256"]:
+        raise ChecksumError(f"Checksum mismatch for the TFLite export of {name} ({exported['file']})")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local model artifact store.")
+    parser.add_argument("command", choices=["prefetch", "verify", "record", "mmap"])
+    parser.add_argument("names", nargs="*", help="artifact names (default: all)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "record":
+        record(args.names)
+        return
+    if args.command == "mmap":
+        export_mmap(args.names)
+        return
+    if args.command == "prefetch":
+        statuses = prefetch(args.names)
+    else:
+        statuses = {}
+        for name, entry in load_manifest().items():
+            if args.names and name not in args.names:
+                continue
+            try:
+                verify(name, entry)
+                statuses[name] = "ok"
+            except FileNotFoundError:
+                statuses[name] = "missing"
+            except ChecksumError as e:
+                statuses[name] = str(e)
+    for name, status in statuses.items():
+        print(f"{name:<16}{status}")
+    if any(status != "ok" for status in statuses.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Micro-batching of concurrent image predictions.
+
+Sessions submit single preprocessed images and get a ``Future`` back. A
+background thread per model collects whatever arrives within a short window
+(``BATCH_MAX_WAIT_MS``, up to ``BATCH_MAX_SIZE`` images) and runs one
+batched forward pass for all of them.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils.metrics import timed
+from utils.model_registry import get_model
+
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "16"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "10"))
+
+
+class MicroBatcher:
+    """Collect single samples into batches for ``predict_fn``.
+
+    ``predict_fn`` receives an array of shape ``(n, *sample_shape)`` and must
+    return one output row per sample.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, name="batcher"):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, sample):
+        """Queue one sample and return a ``Future`` for its output row."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((np.asarray(sample), future))
+        return future
+
+    def predict(self, sample):
+        return self.submit(sample).result()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(sample, future) for sample, future in self._collect()
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            samples, futures = zip(*batch)
+            try:
+                outputs = self.predict_fn(np.stack(samples))
+            except Exception as exc:
+                for future in futures:
+                    future.set_exception(exc)
+                continue
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
+
+
+# ----------------------------
+# Shared per-model batchers
+# ----------------------------
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(name):
+    """Return the process-wide batcher for the image model ``name``."""
+    with _batchers_lock:
+        if name not in _batchers:
+            def predict(batch):
+                with timed(name, "inference"):
+                    return get_model(name).predict(batch)
+            _batchers[name] = MicroBatcher(predict, name=name)
+        return _batchers[name]
@@ -0,0 +1,193 @@
+"""Compiled NumPy evaluator for the fitted random forests.
+
+Every tree of a forest is flattened into shared contiguous arrays (split
+feature, threshold, children and leaf class distribution). Rows descend all
+trees at once, one level per step, so a prediction is a few dozen vectorized
+array operations instead of sklearn's per-call validation and thread-pool
+dispatch. Leaves point to themselves, which lets every row take the same
+number of steps (the forest depth). Missing values (NaN) follow each
+split's ``missing_go_to_left`` as in sklearn; infinite values are rejected
+as sklearn rejects them.
+
+Check it against sklearn on the shipped models with::
+
+    python -m utils.forest breast --samples 2000
+    python -m utils.forest malaria   # checks the malaria lookup table instead
+"""
+import argparse
+import os
+import weakref
+
+import numpy as np
+
+# "compiled" (this module, for small batches) or "sklearn"
+FOREST_BACKEND = os.environ.get("FOREST_BACKEND", "compiled").lower()
+# Above this many rows sklearn's parallel Cython traversal is faster
+MAX_COMPILED_ROWS = 128
+
+
+class CompiledForest:
+    """Flattened ``RandomForestClassifier``/``DecisionTreeClassifier`` for ``predict_proba``."""
+
+    def __init__(self, model):
+        trees = [est.tree_ for est in getattr(model, "estimators_", [model])]
+        self.classes_ = model.classes_
+        self.n_features = model.n_features_in_
+        self.n_trees = len(trees)
+
+        offsets = np.cumsum([0] + [t.node_count for t in trees])
+        n_nodes = offsets[-1]
+        self.feature = np.zeros(n_nodes, dtype=np.intp)
+        self.threshold = np.zeros(n_nodes, dtype=np.float64)
+        self.left = np.empty(n_nodes, dtype=np.intp)
+        self.right = np.empty(n_nodes, dtype=np.intp)
+        self.value = np.empty((n_nodes, len(self.classes_)), dtype=np.float64)
+        # Trees from sklearn < 1.3 have no missing-value routing and reject NaN
+        supports_missing = all(hasattr(t, "missing_go_to_left") for t in trees)
+        self.missing_left = np.zeros(n_nodes, dtype=bool) if supports_missing else None
+        depth = 0
+        for tree, start in zip(trees, offsets[:-1]):
+            nodes = slice(start, start + tree.node_count)
+            own = np.arange(start, start + tree.node_count)
+            leaf = tree.children_left == -1
+            self.feature[nodes] = np.where(leaf, 0, tree.feature)
+            self.threshold[nodes] = tree.threshold
+            self.left[nodes] = np.where(leaf, own, tree.children_left + start)
+            self.right[nodes] = np.where(leaf, own, tree.children_right + start)
+            value = tree.value[:, 0, :]
+            self.value[nodes] = value / value.sum(axis=1, keepdims=True)
+            if supports_missing:
+                self.missing_left[nodes] = tree.missing_go_to_left.astype(bool)
+            depth = max(depth, tree.max_depth)
+        self.roots = offsets[:-1].astype(np.intp)
+        self.depth = depth
+
+    def __setstate__(self, state):
+        # Arrays memory-mapped by joblib.load(mmap_mode="r") become plain
+        # ndarray views so indexing them does not produce np.memmap objects.
+        self.__dict__.update({k: np.asarray(v) if isinstance(v, np.memmap) else v
+                              for k, v in state.items()})
+        self.__dict__.setdefault("missing_left", None)
+
+    def predict_proba(self, X):
+        """Return class probabilities for a 2-D batch of feature rows."""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected rows of {self.n_features} features, got shape {X.shape}")
+        if np.isinf(X).any():
+            raise ValueError("Input contains infinity")
+        missing = np.isnan(X)
+        if not missing.any():
+            missing = None
+        elif self.missing_left is None:
+            raise ValueError("Input contains NaN")
+        rows = np.arange(len(X))[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.depth):
+            feature = self.feature[node]
+            go_left = X[rows, feature] <= self.threshold[node]
+            if missing is not None:
+                go_left |= missing[rows, feature] & self.missing_left[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].mean(axis=1)
+
+
+_compiled = weakref.WeakKeyDictionary()
+
+
+def compiled(model):
+    """Return the ``CompiledForest`` for ``model`` (built once), or None if unsupported."""
+    try:
+        return _compiled[model]
+    except KeyError:
+        pass
+    trees = getattr(model, "estimators_", [model])
+    supported = (getattr(model, "n_outputs_", 1) == 1
+                 and all(hasattr(t, "tree_") for t in trees))
+    forest = CompiledForest(model) if supported else None
+    _compiled[model] = forest
+    return forest
+
+
+def parity_check(model, X):
+    """Compare the compiled forest with ``model.predict_proba`` on ``X``."""
+    X = np.asarray(X, dtype=np.float64)
+    expected = model.predict_proba(X)
+    actual = CompiledForest(model).predict_proba(X)
+    return {
+        "samples": len(X),
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "top1_agreement": float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()),
+    }
+
+
+def _samples(model, count, seed=0):
+    # Draw each feature from the split thresholds the forest actually uses,
+    # jittered to either side, so every branch is exercised.
+    rng = np.random.default_rng(seed)
+    trees = [est.tree_ for est in getattr(model, "estimators_", [model])]
+    X = np.zeros((count, model.n_features_in_))
+    for f in range(model.n_features_in_):
+        thresholds = np.concatenate([t.threshold[t.feature == f] for t in trees])
+        if len(thresholds):
+            X[:, f] = rng.choice(thresholds, count) + rng.choice([-1e-3, 1e-3], count)
+    return X
+
+
+def _check_table(name, table):
+    # The lookup table replaces the forest, so check it against the forest
+    # it was built from on every possible input.
+    import joblib
+
+    from utils import artifacts, malaria_table
+
+    report = malaria_table.parity_check(table, joblib.load(artifacts.resolve(name)))
+    print(f"{name}: lookup table, {report['samples']} inputs, max_abs_diff={report['max_abs_diff']:.3g}, "
+          f"top1_agreement={report['top1_agreement']:.4f}")
+    return report["top1_agreement"] < 1.0 or report["max_abs_diff"] > 1e-9
+
+
+def main(argv=None):
+    import time
+    import warnings
+
+    from utils import malaria_table
+    from utils.model_registry import get_model
+
+    parser = argparse.ArgumentParser(description="Check the compiled forests against sklearn.")
+    parser.add_argument("models", nargs="+", help="registry names of forest models")
+    parser.add_argument("--samples", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name in args.models:
+        model = get_model(name)
+        if isinstance(model, malaria_table.MalariaTable):
+            failed |= _check_table(name, model)
+            continue
+        if compiled(model) is None:
+            parser.error(f"{name} is not served by a forest")
+        X = _samples(model, args.samples)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            report = parity_check(model, X)
+            forest = compiled(model)
+            start = time.perf_counter()
+            for row in X[:100]:
+                model.predict_proba(row[np.newaxis])
+            sklearn_us = (time.perf_counter() - start) / 100 * 1e6
+        start = time.perf_counter()
+        for row in X[:100]:
+            forest.predict_proba(row[np.newaxis])
+        compiled_us = (time.perf_counter() - start) / 100 * 1e6
+        print(f"{name}: {report['samples']} samples, max_abs_diff={report['max_abs_diff']:.3g}, "
+              f"top1_agreement={report['top1_agreement']:.4f}; "
+              f"single row {sklearn_us:.0f} us (sklearn) vs {compiled_us:.0f} us (compiled)")
+        failed |= report["top1_agreement"] < 1.0 or report["max_abs_diff"] > 1e-9
+    if failed:
+        raise SystemExit("Compiled forest or lookup table disagrees with sklearn")
+
+
+if __name__ == "__main__":
+    main()
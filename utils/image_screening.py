@@ -0,0 +1,143 @@
+"""Bulk screening of many images with one of the image models.
+
+Images are read from a ZIP archive or a directory, decoded and resized in the
+preprocessing pool a bounded number of files ahead of the model, and
+classified in fixed-size batches. Results stream out as one CSV row per file
+with the class probabilities, so memory stays flat for any number of films::
+
+    python -m utils.image_screening covid films.zip results.csv --batch-size 32
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+
+import numpy as np
+
+from utils.imaging import preprocess_async
+from utils.predictors import IMAGE_MODELS, classify_images
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+IMAGE_BATCH_SIZE = int(os.environ.get("IMAGE_BATCH_SIZE", "32"))
+
+
+def _is_image(name):
+    base = os.path.basename(name)
+    return name.lower().endswith(IMAGE_EXTENSIONS) and not base.startswith(".") and "__MACOSX" not in name
+
+
+def iter_images(source):
+    """Yield ``(name, data)`` for every image in a ZIP (path or file) or directory.
+
+    ``data`` is the encoded bytes for archive members and the file path for
+    directory entries.
+    """
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                if _is_image(path):
+                    yield os.path.relpath(path, source), path
+        return
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if not info.is_dir() and _is_image(info.filename):
+                yield info.filename, archive.read(info)
+
+
+def count_images(source):
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        return sum(1 for _ in iter_images(source))
+    with zipfile.ZipFile(source) as archive:
+        return sum(1 for info in archive.infolist() if not info.is_dir() and _is_image(info.filename))
+
+
+def screen_images(model_name, source, batch_size=IMAGE_BATCH_SIZE):
+    """Classify every image in ``source`` and yield one result row per file.
+
+    Decoding runs ``2 * batch_size`` files ahead of inference. Files that
+    cannot be decoded get a row with the ``error`` column set.
+    """
+    size = IMAGE_MODELS[model_name]["size"]
+    classes = IMAGE_MODELS[model_name]["classes"]
+    pending = deque()
+    images = iter_images(source)
+
+    def fill():
+        while len(pending) < 2 * batch_size:
+            try:
+                name, data = next(images)
+            except StopIteration:
+                return
+            pending.append((name, preprocess_async(data, size, model_name)))
+
+    fill()
+    while pending:
+        names, arrays, rows = [], [], []
+        while pending and len(arrays) < batch_size:
+            name, future = pending.popleft()
+            try:
+                arrays.append(future.result())
+                names.append(name)
+            except Exception as e:
+                rows.append({"file": name, "error": f"{type(e).__name__}: {e}"})
+            fill()
+        if arrays:
+            for name, result in zip(names, classify_images(model_name, np.stack(arrays))):
+                row = {"file": name, "prediction": result["prediction"], "confidence": result["confidence"]}
+                row.update({f"prob_{c}": result["probabilities"][c] for c in classes})
+                rows.append(row)
+        yield from rows
+
+
+def result_columns(model_name):
+    classes = IMAGE_MODELS[model_name]["classes"]
+    return ["file", "prediction", "confidence"] + [f"prob_{c}" for c in classes] + ["error"]
+
+
+def screen_to_csv(model_name, source, destination, batch_size=IMAGE_BATCH_SIZE, on_progress=None):
+    """Write ``screen_images`` results to a CSV path or text file; returns the row count.
+
+    ``on_progress(files_done, files_per_second)`` is called after every batch.
+    """
+    own_file = isinstance(destination, (str, os.PathLike))
+    out = open(destination, "w", newline="") if own_file else destination
+    try:
+        writer = csv.DictWriter(out, fieldnames=result_columns(model_name), restval="")
+        writer.writeheader()
+        start = time.perf_counter()
+        done = 0
+        for row in screen_images(model_name, source, batch_size):
+            writer.writerow(row)
+            done += 1
+            if on_progress is not None and done % batch_size == 0:
+                on_progress(done, done / (time.perf_counter() - start))
+        if on_progress is not None:
+            on_progress(done, done / max(time.perf_counter() - start, 1e-9))
+        return done
+    finally:
+        if own_file:
+            out.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify every image in a ZIP archive or directory.")
+    parser.add_argument("model", choices=sorted(IMAGE_MODELS))
+    parser.add_argument("source", help="ZIP archive or directory of images")
+    parser.add_argument("destination", help="output CSV")
+    parser.add_argument("--batch-size", type=int, default=IMAGE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    def report(done, per_second):
+        print(f"\r{done:,} images ({per_second:,.1f} images/s)", end="", file=sys.stderr)
+
+    done = screen_to_csv(args.model, args.source, args.destination, args.batch_size, on_progress=report)
+    print(f"\nWrote {done:,} rows to {args.destination}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
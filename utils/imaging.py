@@ -0,0 +1,53 @@
+"""Image decoding and preprocessing shared by the image pages and the API.
+
+Large JPEGs are decoded at a reduced scale with PIL's ``draft()`` (only as
+large as the model input needs), and decoding and resizing run in a shared
+worker pool so a page can start preprocessing as soon as a file arrives.
+Tensors are produced as float32 directly, without a float64 intermediate.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from utils.metrics import timed
+
+PREPROCESS_WORKERS = int(os.environ.get("PREPROCESS_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+
+_executor = ThreadPoolExecutor(max_workers=PREPROCESS_WORKERS, thread_name_prefix="preprocess")
+
+
+def load_image(source, target_size=None):
+    """Open ``source`` (raw bytes or a file-like object) as an RGB image.
+
+    With ``target_size``, JPEGs are decoded at the smallest DCT scale that
+    is still at least that large.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    image = Image.open(source)
+    if target_size is not None and image.format == "JPEG":
+        image.draft("RGB", target_size)
+    return image.convert("RGB")
+
+
+def preprocess_image(image, size):
+    """Resize ``image`` to ``size`` and return a float32 array in [0, 1]."""
+    array = np.asarray(image.resize(size), dtype=np.float32)
+    array *= 1.0 / 255.0
+    return array
+
+
+def decode_and_preprocess(source, size, model="image"):
+    """Decode ``source`` and preprocess it for a model with input ``size``."""
+    with timed(model, "decode"):
+        image = load_image(source, target_size=size)
+    with timed(model, "resize"):
+        return preprocess_image(image, size)
+
+
+def preprocess_async(source, size, model="image"):
+    """Run :func:`decode_and_preprocess` in the worker pool; returns a Future."""
+    return _executor.submit(decode_and_preprocess, source, size, model)
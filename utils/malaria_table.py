@@ -0,0 +1,110 @@
+"""Exhaustive lookup table for the malaria model.
+
+The model sees eight Yes/No symptoms, so there are only 256 possible inputs.
+Each symptom set is packed into one ``uint8`` code (bit ``i`` is
+``MALARIA_COLUMNS[i]``), and the forest's ``predict_proba`` for all 256
+codes is computed once and stored next to the model exports, keyed by the
+model file's SHA-256. Serving is then a table index, for one patient or a
+million, without loading sklearn's estimator at all.
+"""
+import logging
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from utils import artifacts
+
+logger = logging.getLogger(__name__)
+
+N_SYMPTOMS = 8
+TABLE_PATH = os.path.join(artifacts.MMAP_DIR, "malaria_table.npz")
+
+
+def pack_symptoms(binary):
+    """Pack an ``(n, 8)`` 0/1 matrix into ``(n,)`` uint8 symptom codes."""
+    binary = np.asarray(binary, dtype=np.uint8).reshape(-1, N_SYMPTOMS)
+    return np.packbits(binary, axis=1, bitorder="little")[:, 0]
+
+
+def unpack_symptoms(codes):
+    """Inverse of ``pack_symptoms``."""
+    codes = np.asarray(codes, dtype=np.uint8).reshape(-1, 1)
+    return np.unpackbits(codes, axis=1, bitorder="little")
+
+
+class MalariaTable:
+    """Drop-in ``predict_proba`` for the malaria model over packed symptom codes."""
+
+    def __init__(self, probabilities, classes):
+        self.probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+
+    @classmethod
+    def build(cls, model):
+        """Evaluate ``model`` once on every one of the 256 symptom sets."""
+        return cls(model.predict_proba(_every_input()), model.classes_)
+
+    def predict_proba(self, codes):
+        codes = np.asarray(codes)
+        if codes.ndim == 2:  # unpacked 0/1 rows
+            codes = pack_symptoms(codes)
+        return self.probabilities[codes.astype(np.uint8)]
+
+
+def _every_input():
+    import pandas as pd
+
+    from utils.tabular import MALARIA_COLUMNS
+
+    return pd.DataFrame(unpack_symptoms(np.arange(256)).astype(np.int64), columns=MALARIA_COLUMNS)
+
+
+def parity_check(table, model):
+    """Compare ``table`` with ``model.predict_proba`` on all 256 symptom sets."""
+    expected = model.predict_proba(_every_input())
+    actual = table.predict_proba(np.arange(256))
+    return {
+        "samples": 256,
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "top1_agreement": float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()),
+    }
+
+
+def load(model_path):
+    """Return the table for the malaria model at ``model_path``.
+
+    A stored table is used when it was built from a file with the same
+    SHA-256; otherwise it is rebuilt from the model and stored.
+    """
+    digest = artifacts.sha256(model_path)
+    try:
+        with np.load(TABLE_PATH) as stored:
+            if str(stored["source_sha256"]) == digest:
+                return MalariaTable(stored["probabilities"], stored["classes"])
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        pass
+
+    import joblib
+    table = MalariaTable.build(joblib.load(model_path))
+    try:
+        _store(table, digest)
+        logger.info("Built malaria lookup table for model %s", digest[:16])
+    except OSError:
+        logger.warning("Could not store the malaria lookup table at %s", TABLE_PATH)
+    return table
+
+
+def _store(table, digest):
+    # Written aside and renamed into place: worker processes starting
+    # together may be reading the table while another one rebuilds it
+    os.makedirs(os.path.dirname(TABLE_PATH), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(TABLE_PATH), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, probabilities=table.probabilities, classes=table.classes_, source_sha256=np.array(digest))
+        os.replace(tmp_path, TABLE_PATH)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,175 @@
+"""Per-model, per-stage latency histograms and a Prometheus text endpoint.
+
+Stages recorded across the app: ``load``, ``decode``, ``resize``,
+``featurize``, ``inference`` and ``pdf``. The histograms live in this
+process; :func:`render_prometheus` exposes them (plus registry and cache
+gauges) in the Prometheus text format, served by ``/metrics`` in the API
+and, when ``METRICS_PORT`` is set, by a small HTTP server inside the
+Streamlit process.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in seconds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile by interpolating within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Thread-safe collection of histograms keyed by (model, stage)."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get((model, stage))
+            if histogram is None:
+                histogram = self._histograms[(model, stage)] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, model, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(model, stage, time.perf_counter() - start)
+
+    def histograms(self):
+        """Return a snapshot ``{(model, stage): Histogram}``."""
+        with self._lock:
+            snapshot = {}
+            for key, histogram in self._histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+                snapshot[key] = copy
+            return snapshot
+
+    def merged(self, stage):
+        """Combine one stage's histograms across every model."""
+        merged = Histogram()
+        for (_, hist_stage), histogram in self.histograms().items():
+            if hist_stage == stage:
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.sum += histogram.sum
+                merged.count += histogram.count
+        return merged
+
+
+metrics = Metrics()
+
+
+def timed(model, stage):
+    """Context manager recording the block's duration for ``model``/``stage``."""
+    return metrics.timed(model, stage)
+
+
+# ----------------------------
+# Prometheus exposition
+# ----------------------------
+def render_prometheus():
+    """Render all histograms and gauges in the Prometheus text format."""
+    from utils.model_registry import registry
+    from utils.result_cache import prediction_cache
+
+    lines = [
+        "# HELP health_stage_seconds Latency of each processing stage per model.",
+        "# TYPE health_stage_seconds histogram",
+    ]
+    for (model, stage), histogram in sorted(metrics.histograms().items()):
+        labels = f'model="{model}",stage="{stage}"'
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'health_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'health_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"health_stage_seconds_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"health_stage_seconds_count{{{labels}}} {histogram.count}")
+
+    lines += ["# HELP health_model_loaded Whether the model artifact is resident.",
+              "# TYPE health_model_loaded gauge"]
+    rows = registry.stats()
+    lines += [f'health_model_loaded{{model="{r["name"]}"}} {int(r["loaded"])}' for r in rows]
+    lines += ["# HELP health_model_size_bytes Estimated resident size of the model artifact.",
+              "# TYPE health_model_size_bytes gauge"]
+    lines += [f'health_model_size_bytes{{model="{r["name"]}"}} {r["size_bytes"]}' for r in rows]
+
+    cache = prediction_cache.stats()
+    lines += ["# HELP health_prediction_cache_lookups_total Prediction cache lookups by result.",
+              "# TYPE health_prediction_cache_lookups_total counter",
+              f'health_prediction_cache_lookups_total{{result="hit"}} {cache["hits"]}',
+              f'health_prediction_cache_lookups_total{{result="disk_hit"}} {cache["disk_hits"]}',
+              f'health_prediction_cache_lookups_total{{result="miss"}} {cache["misses"]}']
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None):
+    """Serve ``/metrics`` from this process if ``METRICS_PORT`` is set.
+
+    Safe to call on every script run; the server is started only once.
+    """
+    global _server
+    port = port or int(os.environ.get("METRICS_PORT", "0"))
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError:
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
@@ -0,0 +1,273 @@
+"""Process-wide registry for the model artifacts used by the pages.
+
+Every artifact is loaded lazily on first use and shared by all sessions in
+the process. When the combined size of the loaded artifacts exceeds the
+memory budget (``MODEL_MEMORY_BUDGET_MB``, unset or 0 means unlimited), the
+least recently used ones are evicted and reloaded on their next use.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+from utils import artifacts
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(ROOT_DIR, "models")
+
+# "keras" (traced tf.function) or "tflite" (exported with utils.tflite_backend)
+IMAGE_BACKEND = os.environ.get("IMAGE_BACKEND", "keras").lower()
+# Serve sklearn artifacts from their memory-mapped exports (python -m utils.artifacts mmap)
+MODEL_MMAP = os.environ.get("MODEL_MMAP", "0") == "1"
+
+
+# ----------------------------
+# Memory accounting
+# ----------------------------
+def estimate_size(obj, _seen=None):
+    """Approximate the resident size of ``obj`` in bytes.
+
+    NumPy buffers are counted by ``nbytes``; Keras models (and predictors
+    wrapping them) by their parameter count; everything else by walking
+    containers and instance state.
+    """
+    if _seen is None:
+        _seen = {}
+    if id(obj) in _seen:
+        return 0
+    # Keep a reference so temporary state dicts are not freed and their
+    # ids reused while the walk is still running.
+    _seen[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, "count_params"):
+        return int(obj.count_params()) * 4
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        items = list(obj.keys()) + list(obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = list(obj)
+    else:
+        try:
+            state = obj.__getstate__()
+        except Exception:
+            state = getattr(obj, "__dict__", None)
+        items = [state] if state is not None else []
+    return size + sum(estimate_size(item, _seen) for item in items)
+
+
+# ----------------------------
+# Registry
+# ----------------------------
+class ModelRegistry:
+    """Lazy, memory-bounded cache of named model artifacts."""
+
+    def __init__(self, budget_bytes=None):
+        self.budget_bytes = budget_bytes
+        self._loaders = {}
+        self._loaded = OrderedDict()  # name -> (artifact, size_bytes, load_seconds)
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self._versions = {}
+        self._prefetching = set()
+
+    def register(self, name, loader):
+        """Register ``loader`` (a zero-argument callable) under ``name``."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._load_locks[name] = threading.Lock()
+
+    def names(self):
+        return list(self._loaders)
+
+    def version(self, name):
+        """Return a short content hash of ``name``'s artifact file.
+
+        Loaders expose the file they read as a ``path`` attribute; the hash
+        is computed once per process.
+        """
+        with self._lock:
+            if name in self._versions:
+                return self._versions[name]
+        path = getattr(self._loaders[name], "path", None)
+        if path is None or not os.path.exists(path):
+            return "unversioned"
+        digest = artifacts.sha256(path)
+        with self._lock:
+            self._versions[name] = digest[:16]
+            return self._versions[name]
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._loaded
+
+    def get(self, name):
+        """Return the artifact for ``name``, loading it on first use."""
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name][0]
+
+        # Load outside the registry lock so different models load in
+        # parallel, but never load the same model twice.
+        with self._load_locks[name]:
+            with self._lock:
+                if name in self._loaded:
+                    self._loaded.move_to_end(name)
+                    return self._loaded[name][0]
+
+            start = time.perf_counter()
+            artifact = self._loaders[name]()
+            load_seconds = time.perf_counter() - start
+            metrics.observe(name, "load", load_seconds)
+            size = estimate_size(artifact)
+            logger.info("Loaded %s in %.2fs (%.1f MB)", name, load_seconds, size / 1e6)
+
+            with self._lock:
+                self._loaded[name] = (artifact, size, load_seconds)
+                self._evict_over_budget(keep=name)
+            return artifact
+
+    def prefetch(self, name):
+        """Start loading ``name`` in a background thread if it is not resident."""
+        with self._lock:
+            if name in self._loaded or name in self._prefetching:
+                return
+            self._prefetching.add(name)
+
+        def load():
+            try:
+                self.get(name)
+            except Exception:
+                logger.exception("Background load of %s failed", name)
+            finally:
+                with self._lock:
+                    self._prefetching.discard(name)
+        threading.Thread(target=load, name=f"prefetch-{name}", daemon=True).start()
+
+    def evict(self, name):
+        with self._lock:
+            if self._loaded.pop(name, None) is not None:
+                logger.info("Evicted %s", name)
+
+    def clear(self):
+        with self._lock:
+            self._loaded.clear()
+
+    def total_size(self):
+        with self._lock:
+            return sum(size for _, size, _ in self._loaded.values())
+
+    def stats(self):
+        """Return one row per registered model with its load state and size."""
+        with self._lock:
+            rows = []
+            for name in self._loaders:
+                entry = self._loaded.get(name)
+                rows.append({
+                    "name": name,
+                    "loaded": entry is not None,
+                    "size_bytes": entry[1] if entry else 0,
+                    "load_seconds": entry[2] if entry else None,
+                })
+            return rows
+
+    def _evict_over_budget(self, keep):
+        if not self.budget_bytes:
+            return
+        while self.total_size() > self.budget_bytes:
+            victim = next((n for n in self._loaded if n != keep), None)
+            if victim is None:
+                break
+            self.evict(victim)
+
+
+# ----------------------------
+# Artifact loaders
+# ----------------------------
+# Files are listed in models/manifest.json and fetched at deploy time with
+# ``python -m utils.artifacts prefetch``; loading never downloads anything.
+def _joblib_loader(name, entry):
+    def load():
+        path = artifacts.resolve(name)
+        shared = artifacts.mmap_export(name) if MODEL_MMAP else None
+        if shared is not None:
+            return joblib.load(shared, mmap_mode="r")
+        if MODEL_MMAP:
+            logger.warning("No memory-mapped export for %s; loading a private copy", name)
+        return joblib.load(path)
+    load.path = artifacts.artifact_path(entry)
+    return load
+
+
+def _malaria_loader(entry):
+    # Served from its 256-entry lookup table (utils.malaria_table)
+    def load():
+        from utils import malaria_table
+        return malaria_table.load(artifacts.resolve("malaria"))
+    load.path = artifacts.artifact_path(entry)
+    return load
+
+
+def _keras_loader(name, entry, input_shape):
+    path = artifacts.artifact_path(entry)
+
+    def load():
+        if IMAGE_BACKEND == "tflite":
+            exported = artifacts.tflite_export(name)
+            if exported is not None:
+                from utils.tflite_backend import TFLitePredictor
+                return TFLitePredictor(exported, input_shape).warmup()
+            logger.warning("No up-to-date TFLite export for %s; serving the Keras model", name)
+        artifacts.resolve(name)
+        import tensorflow as tf
+        from utils.inference import CompiledPredictor
+        model = tf.keras.models.load_model(path)
+        return CompiledPredictor(model, input_shape).warmup()
+    load.path = path
+    return load
+
+
+def _budget_from_env():
+    megabytes = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", "0") or 0)
+    return int(megabytes * 1024 * 1024) or None
+
+
+registry = ModelRegistry(budget_bytes=_budget_from_env())
+
+IMAGE_INPUT_SHAPES = {
+    "brain": (224, 224, 3),
+    "lung": (224, 224, 3),
+    "covid": (180, 180, 3),
+}
+
+_manifest = artifacts.load_manifest()
+# name -> (filename, input shape)
+IMAGE_ARTIFACTS = {name: (_manifest[name]["file"], shape) for name, shape in IMAGE_INPUT_SHAPES.items()}
+for _name, _entry in _manifest.items():
+    if _entry["framework"] == "keras":
+        registry.register(_name, _keras_loader(_name, _entry, IMAGE_INPUT_SHAPES[_name]))
+    elif _name == "malaria":
+        registry.register(_name, _malaria_loader(_entry))
+    else:
+        registry.register(_name, _joblib_loader(_name, _entry))
+
+
+def get_model(name):
+    """Return the shared artifact registered as ``name``."""
+    return registry.get(name)
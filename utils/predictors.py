@@ -0,0 +1,197 @@
+"""Model-level prediction entry points shared by the pages and the API."""
+import logging
+import os
+import threading
+from contextlib import nullcontext
+
+from utils import worker_pool
+from utils.batching import get_batcher
+from utils.imaging import decode_and_preprocess
+from utils.metrics import timed
+from utils.model_registry import get_model, registry
+from utils.result_cache import features_key, image_key, prediction_cache
+from utils.tabular import TABULAR_MODELS, classify, featurize_record
+from utils.tabular import warm_up as warm_up_tabular
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MODELS = {
+    "brain": {"size": (224, 224), "classes": ['glioma', 'meningioma', 'notumor', 'pituitary']},
+    "lung": {"size": (224, 224), "classes": ['NORMAL', 'PNEUMONIA', 'TUBERCULOSIS']},
+    "covid": {"size": (180, 180), "classes": ['COVID', 'NORMAL']},
+}
+
+PREDICTION_MODELS = ["malaria", "brain", "breast", "lung", "tb_symptoms", "covid"]
+# Models the home page loads and warms up in the background: "all", or a
+# comma-separated subset; empty disables it
+WARMUP_MODELS = os.environ.get("WARMUP_MODELS", "all")
+
+# Registry artifacts each prediction depends on, used to version cache keys
+_ARTIFACTS = {
+    "breast": ["breast", "breast_scaler"],
+    "tb_symptoms": ["tb_symptoms", "tb_scaler", "tb_encoders"],
+}
+
+
+def model_version(model_key):
+    """Return a version string covering every artifact ``model_key`` uses."""
+    return "+".join(registry.version(name) for name in _ARTIFACTS.get(model_key, [model_key]))
+
+
+def _result(classes, probabilities):
+    best = int(probabilities.argmax())
+    return {
+        "prediction": str(classes[best]),
+        "confidence": float(probabilities[best]),
+        "probabilities": {str(c): float(p) for c, p in zip(classes, probabilities)},
+    }
+
+
+def prefetch_model(name):
+    """Start loading ``name`` in the background unless the worker pool serves it."""
+    if not worker_pool.active():
+        registry.prefetch(name)
+
+
+def ensure_model(name):
+    """Block until ``name`` can serve requests, loaded here or warm in a worker."""
+    if worker_pool.active():
+        worker_pool.get_pool().wait_ready(name)
+    else:
+        get_model(name)
+
+
+# ----------------------------
+# Warm-up
+# ----------------------------
+_warmups = {}  # name -> "loading" | "warm" | "failed"
+_warmup_lock = threading.Lock()
+
+
+def warm_up_model(name):
+    """Load ``name`` here and run one dummy prediction so the next request is hot."""
+    if name in TABULAR_MODELS:
+        warm_up_tabular(name)
+    else:
+        get_model(name)  # image loaders trace and warm up the graph while loading
+
+
+def warmup_models():
+    """Return the models named by ``WARMUP_MODELS``."""
+    if WARMUP_MODELS.strip().lower() == "all":
+        return list(PREDICTION_MODELS)
+    return [name.strip() for name in WARMUP_MODELS.split(",") if name.strip() in PREDICTION_MODELS]
+
+
+def start_warmup(names=None):
+    """Warm up ``names`` (default ``warmup_models()``) in background threads.
+
+    Each model is warmed at most once per process, so this is cheap to call
+    on every page run. A model the registry later evicts to stay within
+    ``MODEL_MEMORY_BUDGET_MB`` is not warmed again: reloading it here would
+    only evict another one. Worker processes warm their own models at
+    start, so with the worker pool active this does nothing.
+    """
+    if worker_pool.active():
+        return
+    for name in warmup_models() if names is None else names:
+        with _warmup_lock:
+            if name in _warmups:
+                continue
+            _warmups[name] = "loading"
+        threading.Thread(target=_warm_in_background, args=(name,), name=f"warmup-{name}", daemon=True).start()
+
+
+def _warm_in_background(name):
+    try:
+        warm_up_model(name)
+        state = "warm"
+    except Exception:
+        logger.exception("Warm-up of %s failed", name)
+        state = "failed"
+    with _warmup_lock:
+        _warmups[name] = state
+
+
+def model_status(name):
+    """Return "warm", "loading", "cold" or "failed" for a prediction model."""
+    if worker_pool.active():
+        return worker_pool.get_pool().model_status(name)
+    if registry.is_loaded(name):
+        return "warm"
+    with _warmup_lock:
+        return _warmups.get(name) if _warmups.get(name) in ("loading", "failed") else "cold"
+
+
+def classify_image_batch(name, batch):
+    """Classify a stacked batch of preprocessed images in this process."""
+    with timed(name, "inference"):
+        probabilities = get_model(name).predict(batch)
+    return [_result(IMAGE_MODELS[name]["classes"], row) for row in probabilities]
+
+
+def classify_image_array(name, array):
+    """Classify a preprocessed image array with the image model ``name``."""
+    if worker_pool.active():
+        with timed(name, "inference"):
+            return worker_pool.submit("image", name, array).result()
+    return _result(IMAGE_MODELS[name]["classes"], get_batcher(name).predict(array))
+
+
+def classify_images(name, batch):
+    """Classify a stacked batch of preprocessed images, in the worker pool if enabled."""
+    if worker_pool.active():
+        with timed(name, "inference"):
+            futures = [worker_pool.submit("image", name, array) for array in batch]
+            return [future.result() for future in futures]
+    return classify_image_batch(name, batch)
+
+
+def classify_features(model_key, features):
+    """Classify one featurized tabular row in this process."""
+    scored = classify(model_key, features)
+    return _result(scored["labels"], scored["probabilities"][0])
+
+
+def predict_image(name, source, preprocessing=None, timer=None):
+    """Classify an encoded image (bytes or file-like) with the image model ``name``.
+
+    Resubmitted images are answered from the prediction cache. The pages
+    pass the ``preprocessing`` Future they started when the file was
+    uploaded, and a ``StageTimer`` that is fed the "Model loading",
+    "Preprocessing" and "Inference" stages.
+    """
+    data = source if isinstance(source, (bytes, bytearray)) else source.read()
+    key = image_key(model_version(name), data)
+    result = prediction_cache.get(key)
+    if result is not None:
+        return result
+
+    stage = timer.stage if timer is not None else (lambda _: nullcontext())
+    with stage("Model loading"):
+        ensure_model(name)
+    with stage("Preprocessing"):
+        if preprocessing is not None:
+            array = preprocessing.result()
+        else:
+            array = decode_and_preprocess(data, IMAGE_MODELS[name]["size"], name)
+    with stage("Inference"):
+        # Batched with concurrent sessions' requests for the same model
+        result = classify_image_array(name, array)
+    prediction_cache.set(key, result)
+    return result
+
+
+def predict_record(model_key, record):
+    """Classify one patient record (a feature dict) with a tabular model."""
+    features = featurize_record(model_key, record)
+    key = features_key(model_version(model_key), features)
+    result = prediction_cache.get(key)
+    if result is None:
+        if worker_pool.active():
+            with timed(model_key, "inference"):
+                result = worker_pool.submit("record", model_key, features).result()
+        else:
+            result = classify_features(model_key, features)
+        prediction_cache.set(key, result)
+    return result
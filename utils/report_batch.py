@@ -0,0 +1,148 @@
+"""Batch PDF reports for scored screening results.
+
+The page layout for a given set of input fields is computed once as an
+``fpdf.Template`` element list and reused for every patient. Per-patient
+reports are rendered in a shared pool of spawned processes and streamed
+into a ZIP archive as they complete; a consolidated report renders every
+patient as one page of a single PDF.
+"""
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from fpdf import Template
+
+from utils.metrics import timed
+from utils.reports import to_latin1
+
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+PATIENTS_PER_TASK = 25
+
+_LINE_HEIGHT = 8
+_RESULT_COLUMNS = ("prediction", "confidence")
+
+
+def _text(name, y, text="", bold=False, size=11, align="L", multiline=None):
+    return {
+        "name": name, "type": "T", "x1": 15, "y1": y, "x2": 195, "y2": y + _LINE_HEIGHT,
+        "font": "Arial", "size": size, "bold": bold, "italic": False, "underline": False,
+        "foreground": 0, "backgroud": 0xFFFFFF, "align": align, "text": text,
+        "priority": 0, "multiline": multiline,
+    }
+
+
+@lru_cache(maxsize=32)
+def template_elements(title, input_names):
+    """Lay out the report page once for a title and tuple of input fields."""
+    y = 12
+    elements = [_text("title", y, title, bold=True, size=16, align="C")]
+    y += 2 * _LINE_HEIGHT
+    elements.append(_text("patient", y, bold=True))
+    y += 1.5 * _LINE_HEIGHT
+    elements.append(_text("result_heading", y, "Prediction Result:", bold=True))
+    for name in _RESULT_COLUMNS:
+        y += _LINE_HEIGHT
+        elements.append(_text(name, y))
+    y += 1.5 * _LINE_HEIGHT
+    elements.append(_text("inputs_heading", y, "Patient Inputs:", bold=True))
+    for i, _ in enumerate(input_names):
+        y += _LINE_HEIGHT
+        elements.append(_text(f"input_{i}", y))
+    return elements
+
+
+def _fill(template, record, input_names):
+    template.add_page()
+    template["patient"] = to_latin1(f"Patient: {record['patient_id']}")
+    template["prediction"] = to_latin1(f"Prediction: {record['prediction']}")
+    template["confidence"] = f"Confidence: {float(record['confidence']) * 100:.2f}%"
+    for i, name in enumerate(input_names):
+        template[f"input_{i}"] = to_latin1(f"{name}: {record.get(name, '')}")
+
+
+def render_pages(title, input_names, records):
+    """Render ``records`` as consecutive pages of one PDF and return its bytes."""
+    template = Template(elements=template_elements(title, tuple(input_names)), title=title)
+    for record in records:
+        _fill(template, record, input_names)
+    return template.render(None, dest="S").encode("latin-1")
+
+
+def _entry_name(file_prefix, row, patient_id):
+    # Patient IDs come from the upload: keep them out of the ZIP's paths and
+    # make every entry unique by its row number.
+    safe_id = re.sub(r"[^A-Za-z0-9_-]+", "_", str(patient_id)).strip("_")[:64]
+    return f"{file_prefix}_{row:05d}_{safe_id}.pdf" if safe_id else f"{file_prefix}_{row:05d}.pdf"
+
+
+def _render_individual(title, input_names, records, file_prefix, start):
+    # Runs in a worker process: one PDF per patient, sharing the cached layout.
+    return [(_entry_name(file_prefix, row, record["patient_id"]), render_pages(title, input_names, [record]))
+            for row, record in enumerate(records, start=start)]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _report_pool():
+    """Return the process-wide report pool, started on first use.
+
+    Workers are spawned rather than forked: forking the multithreaded
+    Streamlit server is unsafe.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def report_records(scored):
+    """Turn a scored DataFrame into report records and their input field names.
+
+    Rows that could not be scored and columns that are empty throughout
+    (such as the image screening ``error`` column) are left out.
+    """
+    scored = scored[scored["prediction"].notna()].dropna(axis=1, how="all")
+    input_names = [c for c in scored.columns
+                   if c not in _RESULT_COLUMNS and not str(c).startswith("prob_") and c != "patient_id"]
+    records = scored.to_dict("records")
+    for i, record in enumerate(records, start=1):
+        record.setdefault("patient_id", i)
+    return records, input_names
+
+
+def write_reports_zip(scored, destination, title="Medical Report", file_prefix="report", model="report"):
+    """Render one PDF per scored patient into a ZIP at ``destination``.
+
+    ``destination`` may be a path or a writable binary file object. Returns
+    the number of reports written.
+    """
+    records, input_names = report_records(scored)
+    tasks = [(records[i:i + PATIENTS_PER_TASK], i + 1) for i in range(0, len(records), PATIENTS_PER_TASK)]
+    written = 0
+    with timed(model, "pdf_batch"), zipfile.ZipFile(destination, "w", zipfile.ZIP_DEFLATED) as archive:
+        pool = _report_pool()
+        futures = [pool.submit(_render_individual, title, input_names, task, file_prefix, start)
+                   for task, start in tasks]
+        try:
+            for future in futures:
+                for filename, pdf_bytes in future.result():
+                    archive.writestr(filename, pdf_bytes)
+                    written += 1
+        finally:
+            for future in futures:
+                future.cancel()
+    return written
+
+
+def render_consolidated(scored, title="Medical Report", model="report"):
+    """Render every scored patient as one page of a single PDF."""
+    records, input_names = report_records(scored)
+    with timed(model, "pdf_batch"):
+        return render_pages(title, input_names, records)
@@ -0,0 +1,52 @@
+"""In-memory PDF medical reports for every predictor.
+
+Reports are rendered straight to bytes (never to a shared file on disk), so
+concurrent sessions cannot overwrite each other's reports and pages can hand
+the bytes directly to ``st.download_button``.
+"""
+from fpdf import FPDF
+
+from utils.metrics import timed
+
+
+def to_latin1(text):
+    """Replace characters the core PDF fonts cannot encode (emoji etc.)."""
+    return str(text).encode("latin-1", "replace").decode("latin-1")
+
+
+def generate_report(sections, title="Medical Report", model="report"):
+    """Render a report and return it as PDF bytes.
+
+    ``sections`` is a list of ``(heading, lines)`` pairs; each heading is
+    printed in bold followed by its lines.
+    """
+    with timed(model, "pdf"):
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Arial", size=12)
+        pdf.cell(200, 10, txt=to_latin1(title), ln=True, align='C')
+        pdf.ln(10)
+
+        for heading, lines in sections:
+            pdf.set_font("Arial", style='B', size=12)
+            pdf.cell(200, 10, txt=to_latin1(heading), ln=True)
+            pdf.set_font("Arial", size=12)
+            for line in lines:
+                # multi_cell wraps long lines such as clinical interpretations
+                pdf.multi_cell(190, 10, txt=to_latin1(line))
+            pdf.ln(10)
+
+        return pdf.output(dest="S").encode("latin-1")
+
+
+def prediction_sections(result, inputs=None, interpretation=None):
+    """Build the standard report sections from a predictor result dict."""
+    sections = [("Prediction Result:", [
+        f"Prediction: {result['prediction']}",
+        f"Confidence: {result['confidence'] * 100:.2f}%",
+    ])]
+    if inputs:
+        sections.append(("Patient Inputs:", [f"{name}: {value}" for name, value in inputs.items()]))
+    if interpretation:
+        sections.append(("Clinical Interpretation:", [interpretation]))
+    return sections
@@ -0,0 +1,193 @@
+"""Prediction cache keyed by input fingerprint and model version.
+
+Keys are a SHA-256 of the model version plus the raw image bytes or the
+featurized input vector, so resubmitting the same X-ray or symptom set
+returns the stored result instead of running the model again. Entries
+expire after ``PREDICTION_CACHE_TTL`` seconds, the in-memory tier keeps at
+most ``PREDICTION_CACHE_SIZE`` entries (least recently used evicted first)
+and setting ``PREDICTION_CACHE_DIR`` adds an on-disk tier shared by every
+process on the host. The disk tier is pruned as it grows: expired entries
+are removed and it is cut back to ``PREDICTION_CACHE_DISK_SIZE`` entries,
+oldest first. Disk errors are logged and never fail a prediction.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Check the disk tier's size once every this many writes
+_PRUNE_EVERY = 256
+
+
+class PredictionCache:
+    """Two-tier (memory, optional disk) TTL + LRU cache with hit counters."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600.0, disk_dir=None, disk_max_entries=100_000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _expired(self, stored_at):
+        return self.ttl_seconds and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached value for ``key`` or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is not None:
+                self.disk_hits += 1
+                self._store(key, entry)
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        entry = (time.time(), value)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ----------------------------
+    # Disk tier
+    # ----------------------------
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if self._expired(entry[0]):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so concurrent readers never see a
+            # partially written entry.
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f)
+            os.replace(tmp_path, path)
+            tmp_path = None
+        except OSError:
+            logger.warning("Could not write prediction cache entry to %s", path, exc_info=True)
+            return
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        with self._lock:
+            self._disk_writes += 1
+            due = self._disk_writes % _PRUNE_EVERY == 0
+        if due:
+            self.prune_disk()
+
+    def prune_disk(self):
+        """Remove expired disk entries, then the oldest beyond ``disk_max_entries``."""
+        if not self.disk_dir:
+            return
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".pkl"):
+                    path = os.path.join(root, name)
+                    try:
+                        entries.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+        entries.sort()
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds else None
+        excess = len(entries) - self.disk_max_entries
+        for i, (mtime, path) in enumerate(entries):
+            if i >= excess and (cutoff is None or mtime >= cutoff):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# ----------------------------
+# Cache keys
+# ----------------------------
+def image_key(model_version, data):
+    """Fingerprint encoded image bytes for a given model version."""
+    return hashlib.sha256(model_version.encode() + b"\0" + bytes(data)).hexdigest()
+
+
+def features_key(model_version, features):
+    """Fingerprint a featurized input vector for a given model version."""
+    vector = np.ascontiguousarray(np.asarray(features, dtype=np.float64))
+    return hashlib.sha256(model_version.encode() + b"\0" + vector.tobytes()).hexdigest()
+
+
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get("PREDICTION_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("PREDICTION_CACHE_TTL", "3600")),
+    disk_dir=os.environ.get("PREDICTION_CACHE_DIR") or None,
+    disk_max_entries=int(os.environ.get("PREDICTION_CACHE_DISK_SIZE", "100000")),
+)
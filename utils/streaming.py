@@ -0,0 +1,133 @@
+"""Streaming, fixed-memory scoring of screening files.
+
+Files are processed as a generator pipeline -- read, encode, scale, predict,
+write -- one chunk at a time, so memory stays flat no matter how many rows
+the input has. With ``INFERENCE_WORKERS`` set, each chunk is featurized
+here and scored in the worker pool, a few chunks at a time, like the
+single-record forms. Can also be run from the command line::
+
+    python -m utils.streaming breast patients.csv scored.csv --chunk-size 50000
+"""
+import argparse
+import sys
+import time
+from collections import deque
+
+import pandas as pd
+
+from utils import worker_pool
+from utils.metrics import timed
+from utils.model_registry import get_model
+from utils.tabular import DEFAULT_CHUNK_SIZE, TABULAR_MODELS, class_labels, featurize, score_chunk, scored_frame
+
+
+def _is_parquet(path_or_file):
+    return getattr(path_or_file, "name", str(path_or_file)).lower().endswith(".parquet")
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield ``source`` (a CSV or Parquet path or file) as DataFrame chunks."""
+    if _is_parquet(source):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size)
+
+
+def _score_chunks_in_pool(model_key, chunks):
+    # Keep one chunk per worker in flight so the pool stays busy while the
+    # caller writes out finished chunks; memory stays bounded by that count.
+    pool = worker_pool.get_pool()
+    pending = deque()
+    for chunk in chunks:
+        pending.append((chunk, pool.submit("batch", model_key, featurize(model_key, chunk))))
+        if len(pending) >= worker_pool.INFERENCE_WORKERS:
+            yield _collect(model_key, *pending.popleft())
+    while pending:
+        yield _collect(model_key, *pending.popleft())
+
+
+def _collect(model_key, chunk, future):
+    with timed(model_key, "inference"):
+        scored = future.result()
+    return pd.concat([chunk, scored_frame(scored, chunk.index)], axis=1)
+
+
+def score_chunks(model_key, chunks):
+    """Score each chunk and yield it with the prediction columns appended."""
+    if worker_pool.active():
+        yield from _score_chunks_in_pool(model_key, chunks)
+        return
+    model = get_model(model_key)
+    labels = class_labels(model_key, model)
+    for chunk in chunks:
+        yield pd.concat([chunk, score_chunk(model_key, chunk, model, labels)], axis=1)
+
+
+class _ChunkWriter:
+    """Append scored chunks to a CSV or Parquet destination."""
+
+    def __init__(self, destination):
+        self.destination = destination
+        self.parquet = _is_parquet(destination)
+        self._writer = None
+        self._wrote_header = False
+
+    def write(self, chunk):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.destination, table.schema)
+            self._writer.write_table(table)
+        else:
+            chunk.to_csv(self.destination, mode="a" if self._wrote_header else "w",
+                         header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_stream(model_key, source, destination, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    """Score ``source`` into ``destination`` chunk by chunk.
+
+    ``on_progress(rows_done, rows_per_second)`` is called after every chunk.
+    Returns the number of rows scored.
+    """
+    writer = _ChunkWriter(destination)
+    rows_done = 0
+    start = time.perf_counter()
+    try:
+        for scored in score_chunks(model_key, iter_chunks(source, chunk_size)):
+            writer.write(scored)
+            rows_done += len(scored)
+            if on_progress is not None:
+                elapsed = time.perf_counter() - start
+                on_progress(rows_done, rows_done / elapsed if elapsed > 0 else 0.0)
+    finally:
+        writer.close()
+    return rows_done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a screening file chunk by chunk.")
+    parser.add_argument("model", choices=TABULAR_MODELS)
+    parser.add_argument("source", help="input CSV or Parquet file")
+    parser.add_argument("destination", help="output CSV or Parquet file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    def report(rows_done, rows_per_second):
+        sys.stderr.write(f"\r{rows_done:,} rows scored ({rows_per_second:,.0f} rows/s)")
+        sys.stderr.flush()
+
+    rows = score_stream(args.model, args.source, args.destination, args.chunk_size, on_progress=report)
+    sys.stderr.write(f"\nDone: {rows:,} rows written to {args.destination}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""Vectorized featurization and scoring for the tabular models.
+
+Shared by the single-patient forms and the bulk upload mode so both paths
+encode, scale and predict exactly the same way.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils.forest import FOREST_BACKEND, MAX_COMPILED_ROWS, compiled
+from utils.malaria_table import pack_symptoms
+from utils.metrics import timed
+from utils.model_registry import get_model
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+# ----------------------------
+# Feature schemas
+# ----------------------------
+MALARIA_SYMPTOMS = ["Fever", "Cold", "Rigor", "Fatigue", "Headache", "Bitter Tongue", "Vomiting", "Diarrhea"]
+# Column names the malaria model was fitted with (note the "headace" spelling)
+MALARIA_COLUMNS = ["fever", "cold", "rigor", "fatigue", "headace", "bitter_tongue", "vomiting", "diarrhea"]
+MALARIA_LABELS = {1: "High Possibility of Malaria", 0: "Low Possibility of Malaria"}
+
+BREAST_FEATURES = [
+    'radius_mean', 'perimeter_mean', 'area_mean',
+    'concavity_mean', 'concave points_mean',
+    'radius_worst', 'perimeter_worst', 'area_worst',
+    'concavity_worst', 'concave points_worst'
+]
+BREAST_LABELS = {1: "Malignant", 0: "Benign"}
+
+TB_FEATURES = [
+    "Age", "Gender", "Chest_Pain", "Cough_Severity", "Breathlessness",
+    "Fatigue", "Weight_Loss", "Fever", "Night_Sweats", "Sputum_Production",
+    "Blood_in_Sputum", "Smoking_History", "Previous_TB_History"
+]
+TB_CATEGORICAL = [
+    "Gender", "Chest_Pain", "Fever", "Night_Sweats",
+    "Sputum_Production", "Blood_in_Sputum",
+    "Smoking_History", "Previous_TB_History"
+]
+TB_NUMERIC = ["Age", "Cough_Severity", "Breathlessness", "Fatigue", "Weight_Loss"]
+
+TABULAR_MODELS = ["malaria", "breast", "tb_symptoms"]
+
+_TRUE_VALUES = {"yes", "y", "true", "1", "1.0"}
+_FALSE_VALUES = {"no", "n", "false", "0", "0.0"}
+
+
+def _require_columns(df, columns):
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+
+def _to_binary(column):
+    if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+        return (column.astype(float) > 0).astype(np.int64)
+    return column.astype(str).str.strip().str.lower().isin(_TRUE_VALUES).astype(np.int64)
+
+
+# ----------------------------
+# Featurization
+# ----------------------------
+def _malaria_column(name):
+    # Accept either the page's symptom names or the model's own column names
+    key = str(name).strip().lower().replace(" ", "_")
+    return _MALARIA_ALIASES.get(key, name)
+
+
+_MALARIA_ALIASES = {name.lower().replace(" ", "_"): column
+                    for name, column in zip(MALARIA_SYMPTOMS, MALARIA_COLUMNS)}
+_MALARIA_ALIASES.update({column: column for column in MALARIA_COLUMNS})
+
+
+def featurize_malaria(df):
+    """Map Yes/No (or 1/0) symptom columns to packed ``uint8`` symptom codes.
+
+    Columns may use either the page's symptom names or the model's own.
+    """
+    renamed = df.rename(columns=_malaria_column)
+    _require_columns(renamed, MALARIA_COLUMNS)
+    return pack_symptoms(np.column_stack([_to_binary(renamed[column]) for column in MALARIA_COLUMNS]))
+
+
+def featurize_breast(df):
+    """Scale the ten breast cancer metrics."""
+    _require_columns(df, BREAST_FEATURES)
+    return get_model("breast_scaler").transform(df[BREAST_FEATURES].astype(float))
+
+
+def featurize_tb(df):
+    """Label-encode the categorical TB symptoms and scale the numeric ones."""
+    _require_columns(df, TB_FEATURES)
+    label_encoders = get_model("tb_encoders")
+    features = df[TB_FEATURES].copy()
+    for feature in TB_CATEGORICAL:
+        features[feature] = label_encoders[feature].transform(features[feature].astype(str))
+    features[TB_NUMERIC] = get_model("tb_scaler").transform(features[TB_NUMERIC].astype(float))
+    return features
+
+
+_FEATURIZERS = {
+    "malaria": featurize_malaria,
+    "breast": featurize_breast,
+    "tb_symptoms": featurize_tb,
+}
+
+
+def featurize(model_key, df):
+    with timed(model_key, "featurize"):
+        return _FEATURIZERS[model_key](df)
+
+
+# ----------------------------
+# Single-record featurization
+# ----------------------------
+# The forms score one patient at a time, where building a one-row DataFrame
+# costs far more than the arithmetic. These produce the same (1, n) feature
+# row as the DataFrame featurizers using plain NumPy.
+def _require_keys(record, keys):
+    missing = [k for k in keys if k not in record]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+
+def _binary_value(feature, value):
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, (int, float, np.number)) and value in (0, 1):
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE_VALUES:
+            return 1
+        if text in _FALSE_VALUES:
+            return 0
+    raise ValueError(f"{feature} must be Yes or No")
+
+
+def _number(record, feature):
+    try:
+        value = float(record[feature])
+    except (TypeError, ValueError):
+        value = None
+    if value is None or not np.isfinite(value):
+        raise ValueError(f"{feature} must be a number")
+    return value
+
+
+def _scale(scaler, values):
+    row = np.asarray(values, dtype=np.float64)
+    if scaler.with_mean:
+        row = row - scaler.mean_
+    if scaler.with_std:
+        row = row / scaler.scale_
+    return row
+
+
+def _encode(encoder, feature, value):
+    classes = encoder.classes_
+    value = str(value)
+    index = int(np.searchsorted(classes, value))
+    if index >= len(classes) or classes[index] != value:
+        raise ValueError(f"{feature}: unknown value {value!r}")
+    return index
+
+
+_TB_INDEX = {feature: i for i, feature in enumerate(TB_FEATURES)}
+_TB_NUMERIC_INDEX = [_TB_INDEX[f] for f in TB_NUMERIC]
+
+
+def featurize_malaria_record(record):
+    values = {_malaria_column(k): v for k, v in record.items()}
+    _require_keys(values, MALARIA_COLUMNS)
+    return pack_symptoms([_binary_value(name, values[c]) for name, c in zip(MALARIA_SYMPTOMS, MALARIA_COLUMNS)])
+
+
+def featurize_breast_record(record):
+    _require_keys(record, BREAST_FEATURES)
+    return _scale(get_model("breast_scaler"), [_number(record, f) for f in BREAST_FEATURES])[np.newaxis]
+
+
+def featurize_tb_record(record):
+    _require_keys(record, TB_FEATURES)
+    label_encoders = get_model("tb_encoders")
+    row = np.empty(len(TB_FEATURES), dtype=np.float64)
+    for feature in TB_CATEGORICAL:
+        row[_TB_INDEX[feature]] = _encode(label_encoders[feature], feature, record[feature])
+    row[_TB_NUMERIC_INDEX] = _scale(get_model("tb_scaler"), [_number(record, f) for f in TB_NUMERIC])
+    return row[np.newaxis]
+
+
+_RECORD_FEATURIZERS = {
+    "malaria": featurize_malaria_record,
+    "breast": featurize_breast_record,
+    "tb_symptoms": featurize_tb_record,
+}
+
+
+def featurize_record(model_key, record):
+    """Featurize one patient dict for ``model_key``.
+
+    Returns a ``(1, n_features)`` float row, or for malaria a ``(1,)`` uint8
+    symptom code (see ``utils.malaria_table``).
+    """
+    with timed(model_key, "featurize"):
+        return _RECORD_FEATURIZERS[model_key](record)
+
+
+def class_labels(model_key, model):
+    """Return the human-readable label for each of ``model.classes_``."""
+    if model_key == "malaria":
+        return np.array([MALARIA_LABELS[c] for c in model.classes_])
+    if model_key == "breast":
+        return np.array([BREAST_LABELS[c] for c in model.classes_])
+    return get_model("tb_encoders")["Class"].inverse_transform(model.classes_)
+
+
+# ----------------------------
+# Scoring
+# ----------------------------
+def predict_proba(model, features):
+    """``model.predict_proba`` that accepts bare NumPy rows for models fitted on DataFrames.
+
+    Small batches go through the compiled forest evaluator when available.
+    """
+    if FOREST_BACKEND == "compiled" and len(features) <= MAX_COMPILED_ROWS:
+        forest = compiled(model)
+        if forest is not None:
+            return forest.predict_proba(features)
+    if isinstance(features, np.ndarray):
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            return model.predict_proba(features)
+    return model.predict_proba(features)
+
+
+def classify(model_key, features, model=None, labels=None):
+    """Classify featurized rows with a single ``predict_proba`` pass.
+
+    Returns a dict with the class ``labels``, the per-row ``prediction`` and
+    ``confidence``, and the full ``probabilities`` matrix (one column per
+    label). Single-record and bulk scoring both go through here.
+    """
+    if model is None:
+        model = get_model(model_key)
+    if labels is None:
+        labels = class_labels(model_key, model)
+    with timed(model_key, "inference"):
+        proba = predict_proba(model, features)
+    best = proba.argmax(axis=1)
+    return {
+        "labels": labels,
+        "prediction": labels[best],
+        "confidence": proba[np.arange(len(best)), best],
+        "probabilities": proba,
+    }
+
+
+def _warmup_record(model_key):
+    if model_key == "malaria":
+        return {symptom: "No" for symptom in MALARIA_SYMPTOMS}
+    if model_key == "breast":
+        return {feature: 0.0 for feature in BREAST_FEATURES}
+    encoders = get_model("tb_encoders")
+    record = {feature: encoders[feature].classes_[0] for feature in TB_CATEGORICAL}
+    record.update({feature: 0.0 for feature in TB_NUMERIC})
+    return record
+
+
+def warm_up(model_key):
+    """Load ``model_key`` and its preprocessors and run one dummy prediction.
+
+    Besides the model itself, a first prediction loads the scaler and
+    encoders and builds the compiled forest. Nothing is recorded in metrics.
+    """
+    model = get_model(model_key)
+    class_labels(model_key, model)
+    predict_proba(model, _RECORD_FEATURIZERS[model_key](_warmup_record(model_key)))
+
+
+def scored_frame(scored, index):
+    """Return a ``classify`` result as prediction columns indexed like the chunk."""
+    result = pd.DataFrame({
+        "prediction": scored["prediction"],
+        "confidence": scored["confidence"],
+    }, index=index)
+    for j, label in enumerate(scored["labels"]):
+        result[f"prob_{label}"] = scored["probabilities"][:, j]
+    return result
+
+
+def score_chunk(model_key, chunk, model=None, labels=None):
+    """Return prediction columns for one chunk with a single ``predict_proba``."""
+    return scored_frame(classify(model_key, featurize(model_key, chunk), model, labels), chunk.index)
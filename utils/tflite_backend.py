@@ -0,0 +1,167 @@
+"""TFLite export and runtime backend for the Keras image classifiers.
+
+Export each model once (optionally quantized), check it against the
+original Keras outputs, then serve it with ``IMAGE_BACKEND=tflite``. The
+export is recorded with its checksum and the Keras file's (see
+``utils.artifacts``), so a stale or modified export is never served::
+
+    python -m utils.tflite_backend brain --quantize float16
+    python -m utils.tflite_backend covid --quantize dynamic --samples 64
+
+At runtime the interpreter comes from ``ai_edge_litert`` or
+``tflite_runtime`` when installed (no TensorFlow import at all) and falls
+back to ``tf.lite``. All of them run float kernels through XNNPACK by
+default on CPU.
+"""
+import argparse
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+QUANTIZATIONS = ("none", "float16", "dynamic")
+
+
+def tflite_path(keras_path):
+    """Return the ``.tflite`` path exported next to a Keras model file."""
+    return os.path.splitext(keras_path)[0] + ".tflite"
+
+
+def _interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLitePredictor:
+    """Serve a ``.tflite`` classifier with the same interface as ``CompiledPredictor``."""
+
+    def __init__(self, path, input_shape, num_threads=None):
+        self.path = path
+        self.input_shape = tuple(input_shape)
+        num_threads = num_threads or int(os.environ.get("TFLITE_THREADS", "0")) or os.cpu_count()
+        self._interpreter = _interpreter_class()(model_path=path, num_threads=num_threads)
+        self._input = self._interpreter.get_input_details()[0]["index"]
+        self._output = self._interpreter.get_output_details()[0]["index"]
+        self._batch_size = None
+        # A TFLite interpreter must not be invoked from two threads at once
+        self._lock = threading.Lock()
+
+    def warmup(self):
+        self.predict(np.zeros((1, *self.input_shape), dtype=np.float32))
+        return self
+
+    def predict(self, batch):
+        """Return class probabilities for one image or a batch of images."""
+        batch = np.asarray(batch, dtype=np.float32)
+        single = batch.ndim == len(self.input_shape)
+        if single:
+            batch = batch[np.newaxis]
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input, batch.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+            self._interpreter.set_tensor(self._input, batch)
+            self._interpreter.invoke()
+            output = self._interpreter.get_tensor(self._output).copy()
+        return output[0] if single else output
+
+    def count_params(self):
+        # Used by the registry's memory accounting: approximate by file size
+        return os.path.getsize(self.path) // 4
+
+
+# ----------------------------
+# Export and parity check
+# ----------------------------
+def export_tflite(keras_model, path, quantization="none"):
+    """Convert ``keras_model`` to TFLite at ``path`` and return its size in bytes."""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "dynamic":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif quantization != "none":
+        raise ValueError(f"Unknown quantization: {quantization}")
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+    return os.path.getsize(path)
+
+
+def parity_check(reference, candidate, samples):
+    """Compare two predictors on ``samples`` and summarize their agreement."""
+    expected = np.asarray(reference.predict(samples))
+    actual = np.asarray(candidate.predict(samples))
+    return {
+        "samples": len(samples),
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "mean_abs_diff": float(np.abs(expected - actual).mean()),
+        "top1_agreement": float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()),
+    }
+
+
+def _load_samples(sample_dir, input_shape, count, seed=0):
+    if sample_dir:
+        from utils.imaging import decode_and_preprocess
+        files = sorted(os.path.join(sample_dir, f) for f in os.listdir(sample_dir)
+                       if f.lower().endswith((".jpg", ".jpeg", ".png")))[:count]
+        return np.stack([decode_and_preprocess(f, input_shape[:2][::-1]) for f in files])
+    return np.random.default_rng(seed).random((count, *input_shape), dtype=np.float32)
+
+
+def main(argv=None):
+    from utils import artifacts
+    from utils.model_registry import IMAGE_ARTIFACTS, MODELS_DIR, registry
+
+    parser = argparse.ArgumentParser(description="Export an image model to TFLite and check parity.")
+    parser.add_argument("model", choices=sorted(IMAGE_ARTIFACTS))
+    parser.add_argument("--quantize", choices=QUANTIZATIONS, default="none")
+    parser.add_argument("--samples", type=int, default=32, help="number of images for the parity check")
+    parser.add_argument("--sample-dir", help="directory of real images for the parity check (default: random inputs)")
+    parser.add_argument("--min-agreement", type=float, default=0.99,
+                        help="fail if top-1 agreement with Keras is below this")
+    args = parser.parse_args(argv)
+
+    filename, input_shape = IMAGE_ARTIFACTS[args.model][:2]
+    keras_path = os.path.join(MODELS_DIR, filename)
+    reference = registry.get(args.model)  # CompiledPredictor over the Keras model
+    if isinstance(reference, TFLitePredictor):
+        parser.error("unset IMAGE_BACKEND=tflite to export from the Keras model")
+
+    out_path = tflite_path(keras_path)
+    # Export next to the target and only move it into place once parity
+    # passes, so a failed export never replaces the file being served.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(out_path), suffix=".tflite.tmp")
+    os.close(fd)
+    try:
+        size = export_tflite(reference.model, tmp_path, args.quantize)
+        print(f"Exported {args.model} ({size / 1e6:.1f} MB, Keras file {os.path.getsize(keras_path) / 1e6:.1f} MB)")
+
+        samples = _load_samples(args.sample_dir, input_shape, args.samples)
+        report = parity_check(reference, TFLitePredictor(tmp_path, input_shape), samples)
+        print("Parity:", ", ".join(f"{k}={v:.6g}" if isinstance(v, float) else f"{k}={v}" for k, v in report.items()))
+        if report["top1_agreement"] < args.min_agreement:
+            raise SystemExit(f"Top-1 agreement {report['top1_agreement']:.3f} is below {args.min_agreement}; "
+                             f"{out_path} left unchanged")
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"Wrote {out_path}")
+    artifacts.record_tflite(args.model, out_path, args.quantize)
+    print(f"Recorded the export in {artifacts.TFLITE_INDEX_PATH}")
+
+
+if __name__ == "__main__":
+    main()
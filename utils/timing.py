@@ -0,0 +1,40 @@
+"""Per-stage latency measurement for the prediction pages."""
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Time named stages of a request and report progress between them.
+
+    ``on_progress(fraction, label)`` is called when each stage starts and
+    once more when the last stage finishes, so a page can drive a progress
+    bar from the real work instead of a fixed delay.
+    """
+
+    def __init__(self, stages, on_progress=None):
+        self.stages = list(stages)
+        self.on_progress = on_progress
+        self.durations = OrderedDict()
+
+    @contextmanager
+    def stage(self, name):
+        if self.on_progress is not None:
+            self.on_progress(len(self.durations) / len(self.stages), f"{name}...")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = time.perf_counter() - start
+            if self.on_progress is not None and len(self.durations) == len(self.stages):
+                self.on_progress(1.0, "Done")
+
+    @property
+    def total(self):
+        return sum(self.durations.values())
+
+    def summary(self):
+        """Return a one-line ``stage: ms`` summary including the total."""
+        parts = [f"{name}: {seconds * 1000:.1f} ms" for name, seconds in self.durations.items()]
+        parts.append(f"Total: {self.total * 1000:.1f} ms")
+        return " · ".join(parts)
@@ -0,0 +1,185 @@
+"""Streamlit widgets shared by several pages."""
+import io
+import os
+import tempfile
+import zipfile
+
+import pandas as pd
+import streamlit as st
+
+from utils.artifacts import ChecksumError
+from utils.image_screening import IMAGE_EXTENSIONS, count_images, screen_to_csv
+from utils.imaging import preprocess_async
+from utils.report_batch import render_consolidated, write_reports_zip
+from utils.streaming import score_stream
+from utils.worker_pool import PoolBusy, WorkerUnavailable
+
+# Errors meaning a model cannot serve right now, as opposed to a bad input.
+# TimeoutError is raised while the worker pool is still loading the model.
+MODEL_ERRORS = (FileNotFoundError, ChecksumError, PoolBusy, WorkerUnavailable, TimeoutError)
+
+
+def model_error_message(error):
+    """Return the message to show for one of ``MODEL_ERRORS``."""
+    if isinstance(error, FileNotFoundError):
+        return f"Model file not found at {error.filename}"
+    if isinstance(error, ChecksumError):
+        return f"Model file failed verification: {error}"
+    return "The server is busy. Please retry in a moment."
+
+
+def render_class_distribution(result):
+    """Show the probability of every class from a prediction result."""
+    probabilities = pd.Series(result["probabilities"], name="Probability")
+    st.bar_chart(probabilities, horizontal=True, height=60 + 30 * len(probabilities))
+
+
+def render_bulk_scoring(model_key, expected_columns, file_prefix):
+    """Upload a CSV/Parquet of patients, score it in chunks and offer the results."""
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.subheader("📂 Bulk Scoring")
+    st.caption(f"Upload a CSV or Parquet file with the columns: {', '.join(expected_columns)}. "
+               "For very large exports use `python -m utils.streaming` on the server.")
+
+    results_key = f"{model_key}_bulk_results"
+    uploaded = st.file_uploader("Patients file", type=["csv", "parquet"], key=f"{model_key}_bulk_file")
+    if uploaded is not None and st.button("Score File", key=f"{model_key}_bulk_score"):
+        progress = st.progress(0.0, text="Scoring patients...")
+
+        def report(rows_done, rows_per_second):
+            fraction = min(uploaded.tell() / uploaded.size, 1.0) if uploaded.size else 1.0
+            progress.progress(fraction, text=f"{rows_done:,} rows scored ({rows_per_second:,.0f} rows/s)")
+
+        fd, output_path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        try:
+            rows = score_stream(model_key, uploaded, output_path, on_progress=report)
+            with open(output_path, "rb") as f:
+                # Kept in the session so the report buttons below survive reruns
+                st.session_state[results_key] = (rows, f.read())
+        except MODEL_ERRORS as e:
+            st.session_state.pop(results_key, None)
+            st.error(model_error_message(e))
+        except (ValueError, KeyError) as e:
+            st.session_state.pop(results_key, None)
+            st.error(f"Could not score file: {e}")
+        finally:
+            progress.empty()
+            os.remove(output_path)
+
+    if results_key in st.session_state:
+        rows, results = st.session_state[results_key]
+        st.success(f"Scored {rows:,} patients.")
+        st.dataframe(pd.read_csv(io.BytesIO(results), nrows=100), use_container_width=True)
+        st.download_button(
+            "📥 Download Results (CSV)",
+            data=results,
+            file_name=f"{file_prefix}_predictions.csv",
+            mime="text/csv",
+            key=f"{model_key}_bulk_download",
+        )
+        render_batch_reports(model_key, results, file_prefix)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+# Server-side directories offered for bulk screening must live under this root
+BULK_IMAGE_ROOT = os.environ.get("BULK_IMAGE_ROOT")
+
+
+def _server_directory(model_name):
+    if not BULK_IMAGE_ROOT:
+        return None
+    relative = st.text_input(f"...or a folder under {BULK_IMAGE_ROOT} on the server",
+                             key=f"{model_name}_bulk_dir")
+    if not relative:
+        return None
+    root = os.path.realpath(BULK_IMAGE_ROOT)
+    directory = os.path.realpath(os.path.join(root, relative))
+    if os.path.commonpath([root, directory]) != root or not os.path.isdir(directory):
+        st.error("Folder not found.")
+        return None
+    return directory
+
+
+def render_bulk_image_screening(model_name, file_prefix):
+    """Screen a ZIP (or server folder) of images and offer a CSV of class probabilities."""
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.subheader("📂 Bulk Screening")
+    st.caption(f"Upload a ZIP of images ({', '.join(IMAGE_EXTENSIONS)}). "
+               "For very large sets use `python -m utils.image_screening` on the server.")
+
+    results_key = f"{model_name}_bulk_results"
+    uploaded = st.file_uploader("Images archive", type=["zip"], key=f"{model_name}_bulk_zip")
+    source = uploaded if uploaded is not None else _server_directory(model_name)
+    if source is not None and st.button("Screen Images", key=f"{model_name}_bulk_screen"):
+        progress = st.progress(0.0, text="Screening images...")
+        total = 0
+
+        def report(done, per_second):
+            progress.progress(min(done / total, 1.0) if total else 1.0,
+                              text=f"{done:,} / {total:,} images ({per_second:,.1f} images/s)")
+
+        output = io.StringIO()
+        try:
+            # Opening the archive to count it is where a bad upload fails
+            total = count_images(source)
+            if uploaded is not None:
+                uploaded.seek(0)
+            progress.progress(0.0, text=f"Screening {total:,} images...")
+            rows = screen_to_csv(model_name, source, output, on_progress=report)
+            st.session_state[results_key] = (rows, output.getvalue().encode())
+        except MODEL_ERRORS as e:
+            st.session_state.pop(results_key, None)
+            st.error(model_error_message(e))
+        except zipfile.BadZipFile:
+            st.session_state.pop(results_key, None)
+            st.error("The uploaded file is not a valid ZIP archive.")
+        finally:
+            progress.empty()
+
+    if results_key in st.session_state:
+        rows, results = st.session_state[results_key]
+        st.success(f"Screened {rows:,} images.")
+        st.dataframe(pd.read_csv(io.BytesIO(results), nrows=100), use_container_width=True)
+        st.download_button(
+            "📥 Download Results (CSV)",
+            data=results,
+            file_name=f"{file_prefix}_screening.csv",
+            mime="text/csv",
+            key=f"{model_name}_bulk_download",
+        )
+        render_batch_reports(model_name, results, file_prefix)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+def render_batch_reports(model_key, results_csv, file_prefix):
+    """Offer per-patient (ZIP) or consolidated PDF reports for scored results."""
+    kind = st.radio("Reports", ["Per-patient reports (ZIP)", "Consolidated report (PDF)"],
+                    horizontal=True, key=f"{model_key}_report_kind")
+    if not st.button("🖨️ Generate Reports", key=f"{model_key}_report_generate"):
+        return
+    scored = pd.read_csv(io.BytesIO(results_csv))
+    with st.spinner(f"Rendering {len(scored):,} reports..."):
+        if kind.startswith("Per-patient"):
+            archive = io.BytesIO()
+            write_reports_zip(scored, archive, file_prefix=file_prefix, model=model_key)
+            data, file_name, mime = archive.getvalue(), f"{file_prefix}_reports.zip", "application/zip"
+        else:
+            data = render_consolidated(scored, model=model_key)
+            file_name, mime = f"{file_prefix}_reports.pdf", "application/pdf"
+    st.download_button("📥 Download Reports", data=data, file_name=file_name, mime=mime,
+                       key=f"{model_key}_report_download")
+
+
+def start_image_preprocessing(model_name, uploaded_file, size):
+    """Start decoding ``uploaded_file`` in the background as soon as it arrives.
+
+    The Future is kept in the session so reruns and the Analyze click reuse
+    it instead of decoding the same upload again.
+    """
+    state_key = f"{model_name}_preprocess"
+    cached = st.session_state.get(state_key)
+    if cached is None or cached[0] != uploaded_file.file_id:
+        cached = (uploaded_file.file_id, preprocess_async(uploaded_file.getvalue(), size, model_name))
+        st.session_state[state_key] = cached
+    return cached[1]
@@ -0,0 +1,343 @@
+"""Pre-started inference worker processes for the UI and API processes.
+
+Streamlit runs every session in a thread of one process, so model
+evaluation from concurrent sessions contends for the GIL. With
+``INFERENCE_WORKERS=N`` the pages hand their featurized inputs to N worker
+processes instead. Each worker loads and warms its models at startup and
+then serves requests over its own pipe.
+
+Routing: the tabular forests are small and served by every worker; each
+image model is pinned to its own share of the workers so no process holds
+all three networks. A request goes to the least-loaded worker serving its
+model. Each worker accepts at most ``WORKER_MAX_INFLIGHT`` requests at a
+time; when all of a model's workers are full, ``submit`` blocks for up to
+``WORKER_SUBMIT_TIMEOUT`` seconds and then raises ``PoolBusy``.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+WORKER_MAX_INFLIGHT = int(os.environ.get("WORKER_MAX_INFLIGHT", "8"))
+WORKER_SUBMIT_TIMEOUT = float(os.environ.get("WORKER_SUBMIT_TIMEOUT", "30"))
+WORKER_READY_TIMEOUT = float(os.environ.get("WORKER_READY_TIMEOUT", "300"))
+# "spawn" is safe from a multithreaded parent such as the Streamlit server
+WORKER_START_METHOD = os.environ.get("WORKER_START_METHOD", "spawn")
+
+_in_worker = False
+
+
+class PoolBusy(RuntimeError):
+    """Every worker serving a model already has its maximum of requests in flight."""
+
+
+class WorkerUnavailable(RuntimeError):
+    """The worker handling a request exited or could not be reached."""
+
+
+def default_routes(num_workers, tabular_models, image_models):
+    """Return ``{model: [worker indices]}`` for ``num_workers`` workers."""
+    routes = {name: list(range(num_workers)) for name in tabular_models}
+    for i, name in enumerate(image_models):
+        routes[name] = [w for w in range(num_workers) if w % len(image_models) == i] or [i % num_workers]
+    return routes
+
+
+# ----------------------------
+# Worker process
+# ----------------------------
+def _picklable(exc):
+    try:
+        pickle.dumps(exc)
+        return exc
+    except Exception:
+        return RuntimeError(repr(exc))
+
+
+def _handle(requests):
+    from utils.predictors import classify_features, classify_image_batch
+    from utils.tabular import classify
+
+    # Images queued for the same model are evaluated as one batch
+    images = defaultdict(list)
+    for request_id, kind, name, payload in requests:
+        if kind == "image":
+            images[name].append((request_id, payload))
+            continue
+        try:
+            if kind == "batch":
+                yield request_id, (True, classify(name, payload))
+            else:
+                yield request_id, (True, classify_features(name, payload))
+        except Exception as e:
+            yield request_id, (False, _picklable(e))
+    for name, items in images.items():
+        try:
+            results = classify_image_batch(name, np.stack([payload for _, payload in items]))
+        except Exception as e:
+            for request_id, _ in items:
+                yield request_id, (False, _picklable(e))
+        else:
+            for (request_id, _), result in zip(items, results):
+                yield request_id, (True, result)
+
+
+def _worker_main(conn, models, threads):
+    global _in_worker
+    _in_worker = True
+    # Split the host's cores between the workers instead of every TF and
+    # BLAS thread pool sizing itself to the whole machine.
+    for var in ("TF_NUM_INTRAOP_THREADS", "OMP_NUM_THREADS", "TFLITE_THREADS"):
+        os.environ.setdefault(var, str(threads))
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+
+    from utils.predictors import warm_up_model
+    status = {}
+    for name in models:
+        try:
+            warm_up_model(name)
+            status[name] = None
+        except Exception as e:
+            status[name] = _picklable(e)
+    conn.send(("ready", status))
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        requests = [request]
+        while len(requests) < WORKER_MAX_INFLIGHT and conn.poll():
+            request = conn.recv()
+            if request is None:
+                break
+            requests.append(request)
+        for request_id, outcome in _handle(requests):
+            conn.send((request_id, outcome))
+        if request is None:
+            return
+
+
+# ----------------------------
+# Pool (UI side)
+# ----------------------------
+class _Worker:
+    def __init__(self, index, models, context, threads):
+        self.index = index
+        self.models = models
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, models, threads),
+                                       name=f"inference-{index}", daemon=True)
+        self.process.start()
+        child.close()
+        self.started = time.monotonic()
+        self.inflight = {}  # request_id -> Future
+        self.status = {}
+        self.ready = threading.Event()
+        self.send_lock = threading.Lock()
+
+
+class WorkerPool:
+    """Route inference requests to pre-started, pre-warmed worker processes."""
+
+    def __init__(self, routes, max_inflight=WORKER_MAX_INFLIGHT,
+                 submit_timeout=WORKER_SUBMIT_TIMEOUT, start_method=WORKER_START_METHOD):
+        self.routes = routes
+        self.max_inflight = max_inflight
+        self.submit_timeout = submit_timeout
+        self._context = multiprocessing.get_context(start_method)
+        num_workers = 1 + max(max(workers) for workers in routes.values())
+        self._models = {w: [m for m, workers in routes.items() if w in workers] for w in range(num_workers)}
+        self._threads = max(1, (os.cpu_count() or 1) // num_workers)
+        self._ids = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._workers = [self._spawn(w) for w in range(num_workers)]
+        threading.Thread(target=self._receive, name="inference-results", daemon=True).start()
+
+    def _spawn(self, index):
+        return _Worker(index, self._models[index], self._context, self._threads)
+
+    def submit(self, kind, name, payload):
+        """Queue one request and return a Future.
+
+        ``kind`` is "image" (one preprocessed image), "record" (one featurized
+        row) or "batch" (a featurized chunk of rows, scored in one pass).
+        """
+        if name not in self.routes:
+            raise KeyError(f"Unknown model: {name}")
+        deadline = time.monotonic() + self.submit_timeout
+        with self._cond:
+            while True:
+                worker = min((self._workers[w] for w in self.routes[name]), key=lambda w: len(w.inflight))
+                if len(worker.inflight) < self.max_inflight:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolBusy(f"All workers serving {name} are busy")
+                self._cond.wait(remaining)
+            request_id = next(self._ids)
+            future = worker.inflight[request_id] = Future()
+        try:
+            with worker.send_lock:
+                worker.conn.send((request_id, kind, name, payload))
+        except (OSError, ValueError) as e:
+            with self._cond:
+                worker.inflight.pop(request_id, None)
+                self._cond.notify_all()
+            future.set_exception(WorkerUnavailable(f"Inference worker {worker.index} is unavailable: {e}"))
+        return future
+
+    def wait_ready(self, name, timeout=WORKER_READY_TIMEOUT):
+        """Block until a worker serving ``name`` has loaded it; re-raise its load error."""
+        deadline = time.monotonic() + timeout
+        workers = [self._workers[w] for w in self.routes[name]]
+        while not any(w.ready.is_set() for w in workers):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No inference worker has loaded {name}")
+            workers[0].ready.wait(0.1)
+            workers = [self._workers[w] for w in self.routes[name]]
+        errors = [w.status.get(name) for w in workers if w.ready.is_set()]
+        if all(error is not None for error in errors):
+            raise errors[0]
+
+    def is_ready(self, name):
+        return any(self._workers[w].ready.is_set() and self._workers[w].status.get(name) is None
+                   for w in self.routes.get(name, []))
+
+    def model_status(self, name):
+        """Return "warm" once a worker serves ``name``, "failed" if every worker
+        failed to load it, and "loading" before then."""
+        if self.is_ready(name):
+            return "warm"
+        workers = [self._workers[w] for w in self.routes.get(name, [])]
+        if workers and all(w.ready.is_set() for w in workers):
+            return "failed"
+        return "loading"
+
+    def stats(self):
+        """Return one row per worker with its process state and load."""
+        with self._cond:
+            return [{
+                "index": w.index,
+                "pid": w.process.pid,
+                "alive": w.process.is_alive(),
+                "ready": w.ready.is_set(),
+                "models": list(w.models),
+                "inflight": len(w.inflight),
+            } for w in self._workers]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=5)
+
+    def _receive(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                workers = list(self._workers)
+            connections = {w.conn: w for w in workers}
+            sentinels = {w.process.sentinel: w for w in workers}
+            for ready in wait(list(connections) + list(sentinels), timeout=1.0):
+                if ready in connections:
+                    worker = connections[ready]
+                    try:
+                        message = ready.recv()
+                    except (EOFError, OSError):
+                        self._replace(worker)
+                        continue
+                    self._dispatch(worker, message)
+                elif sentinels[ready].process.exitcode is not None:
+                    self._replace(sentinels[ready])
+
+    def _dispatch(self, worker, message):
+        request_id, payload = message
+        if request_id == "ready":
+            worker.status = payload
+            worker.ready.set()
+            logger.info("Inference worker %d ready (%s)", worker.index, ", ".join(worker.models))
+            return
+        with self._cond:
+            future = worker.inflight.pop(request_id, None)
+            self._cond.notify_all()
+        if future is None:
+            return
+        ok, value = payload
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _replace(self, worker):
+        with self._cond:
+            if self._closed or self._workers[worker.index] is not worker:
+                return
+            failed, worker.inflight = worker.inflight, {}
+        logger.warning("Inference worker %d exited (code %s); restarting",
+                       worker.index, worker.process.exitcode)
+        if not worker.ready.is_set() and time.monotonic() - worker.started < 5:
+            time.sleep(1.0)  # crashed during startup: don't restart in a tight loop
+        replacement = self._spawn(worker.index)
+        with self._cond:
+            self._workers[worker.index] = replacement
+            self._cond.notify_all()
+        for future in failed.values():
+            future.set_exception(WorkerUnavailable(f"Inference worker {worker.index} exited"))
+
+
+# ----------------------------
+# Process-wide pool
+# ----------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def active():
+    """True when requests from this process should go to the worker pool."""
+    return INFERENCE_WORKERS > 0 and not _in_worker
+
+
+def start_worker_pool(num_workers=None):
+    """Start the process-wide pool once; a no-op unless ``INFERENCE_WORKERS`` is set."""
+    global _pool
+    num_workers = INFERENCE_WORKERS if num_workers is None else num_workers
+    if _in_worker or num_workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            from utils.model_registry import IMAGE_INPUT_SHAPES
+            from utils.tabular import TABULAR_MODELS
+            _pool = WorkerPool(default_routes(num_workers, TABULAR_MODELS, list(IMAGE_INPUT_SHAPES)))
+            logger.info("Started %d inference workers", num_workers)
+        return _pool
+
+
+def get_pool():
+    return start_worker_pool()
+
+
+def submit(kind, name, payload):
+    return get_pool().submit(kind, name, payload)